@@ -0,0 +1,116 @@
+import re
+import numpy as np
+
+# Bulk reader of strike/dip/rake files such as angelier-data.txt: the whole file is
+# tokenized by one regular expression, and the conversions of mplstereonet.parse_rake,
+# parse_strike_dip and azimuth2rake are written with arrays, so that large catalogs of
+# faults load in one pass. The vectors are in geographic coordinates (east, north, up).
+
+# A line is 'strike dip rake', the dip and the rake being optionally followed by direction
+# letters (e.g. '045 61S 80E'). A rake without letters is the azimuth of the slickenslides.
+LINE = re.compile(r'^[ \t]*([-+\d.]+)[ \t]+([-+\d.]+)([NESWnesw]*)[ \t]+([-+\d.]+)([NESWnesw]*)[ \t]*$', re.M)
+AZIMUTHS = {'N': 0, 'E': 90, 'S': 180, 'W': 270}
+
+
+def letterAzimuth(letters: str) -> float:
+    """ The azimuth of quadrant letters (e.g. 'NW' is 315), as mplstereonet.utilities.quadrantletter_to_azimuth """
+    letters = letters.strip().upper()
+    azimuth = AZIMUTHS[letters[-1]]
+    for letter in letters[1::-1]:
+        # The circular mean of the two azimuths
+        a = np.radians([azimuth, AZIMUTHS[letter]])
+        azimuth = np.degrees(np.arctan2(np.sin(a).mean(), np.cos(a).mean()))
+    return azimuth
+
+
+def letterAzimuths(letters: np.ndarray) -> np.ndarray:
+    """ letterAzimuth of an array of letters (nan where there are none): each distinct
+    string is converted once
+    """
+    unique, inverse = np.unique(letters, return_inverse=True)
+    azimuths = np.array([letterAzimuth(x) if x else np.nan for x in unique])
+    return azimuths[inverse]
+
+
+def oppositeEnd(azimuths: np.ndarray, directions: np.ndarray) -> np.ndarray:
+    """ True where the direction (an azimuth) points to the opposite end of the azimuth """
+    # The dot product of the two unit vectors, computed as in mplstereonet so that the
+    # perpendicular cases are decided in the same way
+    a, b = np.radians(azimuths), np.radians(directions)
+    return np.cos(b) * np.cos(a) + np.sin(b) * np.sin(a) < 0
+
+
+def parseStrikeDip(strikes: np.ndarray, dips: np.ndarray, dipLetters: np.ndarray) -> np.ndarray:
+    """ The strikes following the right-hand rule, as mplstereonet.parse_strike_dip """
+    direction = letterAzimuths(dipLetters)
+    flip = ~np.isnan(direction) & oppositeEnd(strikes + 90, direction)
+    strikes = np.where(flip, strikes + 180, strikes)
+    return np.where(strikes > 360, strikes - 360, strikes)
+
+
+def letterRakes(strikes: np.ndarray, rakes: np.ndarray, rakeLetters: np.ndarray) -> np.ndarray:
+    """ The rakes in [0, 180] measured from the end of the strike, as mplstereonet.parse_rake """
+    rakes = np.where(oppositeEnd(strikes, letterAzimuths(rakeLetters)), -rakes, rakes)
+    return np.where(rakes < 0, rakes + 180, np.where(rakes > 180, rakes - 180, rakes))
+
+
+def azimuthRakes(strikes: np.ndarray, dips: np.ndarray, azimuths: np.ndarray) -> np.ndarray:
+    """ The rakes in [-90, 90] of the lines of the planes whose horizontal projection is
+    along the azimuths, as mplstereonet.azimuth2rake
+
+    In the plane, the line a.strike + b.dip (unit vectors) has the horizontal direction
+    a (sin s, cos s) + b cos(dip) (cos s, -sin s): along the azimuth when a = cos(az - s)
+    and b cos(dip) = sin(az - s), and its rake is atan(b / a).
+    """
+    d = np.radians(azimuths - strikes)
+    with np.errstate(divide='ignore'):
+        return np.degrees(np.arctan(np.sin(d) / (np.cos(d) * np.cos(np.radians(dips)))))
+
+
+def poles(strikes, dips) -> np.ndarray:
+    """ The (n, 3) unit normals of the planes, pointing downward (lower hemisphere) """
+    s, d = np.radians(strikes), np.radians(dips)
+    return np.column_stack((-np.cos(s) * np.sin(d), np.sin(s) * np.sin(d), -np.cos(d)))
+
+
+def slips(strikes, dips, rakes) -> np.ndarray:
+    """ The (n, 3) unit directions of the slip lines, at `rakes` degrees from the strike
+    direction, downward in the planes
+    """
+    # A negative rake is the same line as rake + 180, which points downward
+    rakes = np.asarray(rakes, dtype=float)
+    s, d, r = np.radians(strikes), np.radians(dips), np.radians(np.where(rakes < 0, rakes + 180, rakes))
+    strike = np.column_stack((np.sin(s), np.cos(s), np.zeros_like(s)))
+    dip = np.column_stack((np.cos(s) * np.cos(d), -np.sin(s) * np.cos(d), -np.sin(d)))
+    return np.cos(r)[:, None] * strike + np.sin(r)[:, None] * dip
+
+
+def loadAngelier(filename: str) -> dict:
+    """ Read a strike/dip/rake file (the lines starting with '#' are comments)
+
+    Args:
+        filename (str): the file, e.g. angelier-data.txt
+
+    Returns:
+        dict: the (n,) 'strike' (right-hand rule), 'dip' and 'rake' (measured downward from
+        the strike direction, negative toward the opposite end), the (n,) mask 'lettered'
+        of the rakes given with letters (the others being azimuths of the slickenslides),
+        and the (n, 3) 'poles' and 'slips' unit vectors (east, north, up)
+    """
+    with open(filename, 'r') as f:
+        text = f.read()
+    rows = LINE.findall(text)
+    lines = [x for x in text.splitlines() if x.strip() and not x.lstrip().startswith('#')]
+    if len(rows) != len(lines):
+        raise ValueError(f'{filename}: {len(lines) - len(rows)} lines are not "strike dip rake"')
+
+    columns = np.array(rows, dtype=str).reshape(-1, 5).T
+    strike, dip, rake = columns[0].astype(float), columns[1].astype(float), columns[3].astype(float)
+    strike = parseStrikeDip(strike, dip, columns[2])
+    lettered = columns[4] != ''
+    rake[lettered] = letterRakes(strike[lettered], rake[lettered], columns[4][lettered])
+    rake[~lettered] = azimuthRakes(strike[~lettered], dip[~lettered], rake[~lettered])
+    return {
+        'strike': strike, 'dip': dip, 'rake': rake, 'lettered': lettered,
+        'poles': poles(strike, dip), 'slips': slips(strike, dip, rake)
+    }
@@ -0,0 +1,73 @@
+import os
+import json
+import hashlib
+import numpy as np
+import mplstereonet
+from mplstereonet import stereonet_math
+
+# Density grids of stereonets computed once: the grid of mplstereonet.density_grid depends
+# only on the measurements and on the kernel parameters, not on the styling of the plot.
+# The grids are cached in memory and on disk, under a hash of the pole array and of the
+# parameters, so that redrawing (other colormap, levels, ...) does not recompute them.
+
+
+class DensityCache:
+    """ The density grids (lon, lat, totals), in memory and as .npz files in `directory` """
+    directory: str
+    memory: dict[str, tuple]
+
+    def __init__(self, directory: str = '.density-cache') -> None:
+        self.directory = directory
+        self.memory = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, strikes, dips, measurement: str = 'poles', method: str = 'exponential_kamb',
+            sigma: float = 3, gridsize: int = 100, weights=None) -> str:
+        # The poles, the strikes being first reduced to [0, 360) so that the same planes
+        # give the same key
+        h = hashlib.sha256()
+        for array in stereonet_math.pole(np.mod(np.array(strikes, dtype=float), 360), np.array(dips, dtype=float)):
+            h.update(np.ascontiguousarray(array, dtype=float).tobytes())
+        if weights is not None:
+            h.update(np.ascontiguousarray(weights, dtype=float).tobytes())
+        params = [measurement, method, float(sigma), gridsize, mplstereonet.__version__]
+        h.update(json.dumps(params).encode())
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.npz')
+
+    def grid(self, strikes, dips, measurement: str = 'poles', method: str = 'exponential_kamb',
+             sigma: float = 3, gridsize: int = 100, weights=None) -> tuple:
+        """ The density grid of the measurements, as mplstereonet.density_grid (same parameters)
+
+        Returns:
+            tuple: the lon, lat and totals arrays, to be drawn by densityContourf or densityContour
+        """
+        key = self.key(strikes, dips, measurement, method, sigma, gridsize, weights)
+        if key in self.memory:
+            return self.memory[key]
+        try:
+            with np.load(self.path(key)) as f:
+                result = f['lon'], f['lat'], f['totals']
+        except (OSError, KeyError, ValueError):
+            result = mplstereonet.density_grid(strikes, dips, measurement=measurement, method=method,
+                                               sigma=sigma, gridsize=gridsize, weights=weights)
+            # Write in a temporary file, then rename: a grid is never read half-written
+            tmp = self.path(key) + f'.{os.getpid()}.tmp.npz'
+            np.savez(tmp, lon=result[0], lat=result[1], totals=result[2])
+            os.replace(tmp, self.path(key))
+        self.memory[key] = result
+        return result
+
+
+def densityContourf(ax, grid: tuple, **kwargs):
+    """ Same as ax.density_contourf, for a grid given by DensityCache.grid """
+    lon, lat, totals = grid
+    return ax.contourf(lon, lat, totals, **kwargs)
+
+
+def densityContour(ax, grid: tuple, **kwargs):
+    """ Same as ax.density_contour, for a grid given by DensityCache.grid """
+    lon, lat, totals = grid
+    return ax.contour(lon, lat, totals, **kwargs)
@@ -0,0 +1,47 @@
+import numpy as np
+from Data import Data
+
+
+class ArrayData:
+    """ The data stored as arrays (instead of one object per measurement)
+
+    - normals: (n, 2) array in the chosen precision ('float64' or 'float32')
+    - weights: (n,) float64 array
+    - types: (n,) type code of each measurement (see DataFactory.register)
+    """
+    normals: np.ndarray
+    weights: np.ndarray
+    types: np.ndarray
+
+    def __init__(self, data: list[Data], precision: str = 'float64') -> None:
+        if hasattr(data, 'arrays'):
+            # A MeasurementStore (see store.py): its arrays are copied directly
+            data = data.arrays(precision)
+            self.normals, self.weights, self.types = data.normals, data.weights, data.types
+            return
+        self.normals = np.array([x.n for x in data], dtype=precision).reshape(-1, 2)
+        self.weights = np.array([x.w for x in data], dtype=float)
+        self.types = np.array([x.code for x in data], dtype=np.int16)
+
+    @staticmethod
+    def fromArrays(normals: np.ndarray, weights: np.ndarray, types: np.ndarray) -> 'ArrayData':
+        data = ArrayData([], normals.dtype.name)
+        data.normals, data.weights, data.types = normals, weights, types
+        return data
+
+    def subset(self, mask: np.ndarray) -> 'ArrayData':
+        """ The measurements selected by a boolean mask (or an array of indices) """
+        return ArrayData.fromArrays(self.normals[mask], self.weights[mask], self.types[mask])
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    @property
+    def precision(self) -> str:
+        return self.normals.dtype.name
+
+    def groups(self):
+        """ For each type code, the code, its normals and its weights """
+        for code in np.unique(self.types):
+            mask = self.types == code
+            yield int(code), self.normals[mask], self.weights[mask]
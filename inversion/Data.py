@@ -1,16 +1,106 @@
 from myTypes import Vector
 import RemoteStress
 from abc import abstractmethod
+import numpy as np
 
 
 class Data:
-    n_: Vector
+    """ An immutable measurement: its normal is stored as a tuple and the instances
+    have no __dict__ (the subclasses must also declare __slots__)
+    """
+    __slots__ = ('n_', 'w_')
+    code: int  # the type code, given by DataFactory.register
+    # The Lipschitz constants of the cost with respect to theta (in radians) and k
+    # (see branchbound.py)
+    lipschitz: tuple[float, float]
+    n_: tuple[float, float]
+    w_: float
 
-    def __init__(self, n: Vector) -> None: self.n_ = n
+    def __init__(self, n: Vector, w: float = 1.0) -> None:
+        object.__setattr__(self, 'n_', (float(n[0]), float(n[1])))
+        object.__setattr__(self, 'w_', float(w))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        # For pickle (e.g., multiprocessing), which cannot set the attributes
+        return type(self), (self.n_, self.w_)
 
     @property
     def n(self):
         return self.n_
 
+    @property
+    def w(self):
+        return self.w_
+
     @abstractmethod
     def cost(self, r: RemoteStress) -> float: pass
+
+    @staticmethod
+    @abstractmethod
+    def batchCost(normals, weights, S1, S3, backend):
+        """ The vectorized version of cost: the weighted sums of the costs of all
+        the normals of this type, for each of the m remote stresses given by their
+        principal directions S1 and S3 (see backends.py)
+        """
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def batchInliers(normals, weights, S1, S3, threshold: float, backend):
+        """ The weighted number of normals whose cost is <= threshold, for each
+        of the m remote stresses
+        """
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def batchResiduals(normals, S1, S3, backend):
+        """ The cost of each normal for one remote stress (S1 and S3 are vectors) """
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def batchDerivatives(normals, weights, theta: float, k: float):
+        """ The weighted sums of the costs of all the normals of this type for one remote
+        stress (theta in degrees), and of their first and second derivatives with respect
+        to (theta in radians, k): (cost, gradient (2,), hessian (2, 2))
+        """
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def batchFit(normals):
+        """ For each normal, the orientation theta (in degrees) of the remote
+        stress for which its cost is zero (the cost does not depend on k)
+        """
+        pass
+
+
+def axialDerivatives(normals, weights, axis, derivative):
+    """ batchDerivatives of the costs 1 - |n.S| for a unit axis S(theta) whose derivative
+    with respect to theta is `derivative` (so that its second derivative is -S). At the
+    kinks of |.| (n.S = 0), the subgradient 0 (the one of minimal norm) is used.
+    """
+    normals = np.asarray(normals, dtype=float).reshape(-1, 2)
+    weights = np.asarray(weights, dtype=float)
+    p = normals @ axis
+    cost = np.dot(weights, 1 - np.abs(p))
+    gradient = -np.dot(weights, np.sign(p) * (normals @ derivative))
+    curvature = np.dot(weights, np.abs(p))
+    return cost, np.array([gradient, 0.0]), np.array([[curvature, 0.0], [0.0, 0.0]])
+
+
+def meanCost(data: list[Data], r: RemoteStress) -> float:
+    """ The weighted mean cost of a list of Data for a given remote stress
+
+    Args:
+        data (list[Data]): a list of Data
+        r (RemoteStress): the remote stress
+    """
+    return sum(x.w * x.cost(r) for x in data) / sum(x.w for x in data)
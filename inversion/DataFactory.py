@@ -2,12 +2,75 @@ import Data
 from Joint import Joint
 from Stylolite import Stylolite
 from myTypes import Vector
+from backends import Backend, getBackend
 
+# The registered types of data. The type code of a class is its index in `classes`,
+# and kernels[code](normals, weights, S1, S3, backend) is its batch cost kernel.
+classes: list[type] = []
+kernels: list = []
+names: dict[str, int] = {}
 
-def create(name: str, n: Vector) -> Data:
-    if name == 'joint' or name == 'dike' or name == 'dyke':
-        return Joint(n)
-    elif name == 'stylolite':
-        return Stylolite(n)
-    else:
-        raise Exception('data type {dataType} is unknown!')
+
+def register(cls: type, *aliases: str, kernel=None) -> int:
+    """ Register a new type of data under one or more names
+
+    Args:
+        cls (type): the Data class
+        aliases (str): the names used in create (e.g., 'joint', 'dike')
+        kernel (optional): the batch cost kernel. Defaults to cls.batchCost
+
+    Returns:
+        int: the type code of the class
+    """
+    if cls not in classes:
+        classes.append(cls)
+        kernels.append(kernel or cls.batchCost)
+    cls.code = classes.index(cls)
+    if kernel is not None:
+        kernels[cls.code] = kernel
+    for name in aliases:
+        names[name] = cls.code
+    return cls.code
+
+
+register(Joint, 'joint', 'dike', 'dyke')
+register(Stylolite, 'stylolite')
+
+
+def typeCode(name: str) -> int:
+    """ The type code of the data type `name` """
+    if name not in names:
+        raise Exception(f'data type {name} is unknown!')
+    return names[name]
+
+
+def create(name: str, n: Vector, w: float = 1.0) -> Data:
+    return classes[typeCode(name)](n, w)
+
+
+def groups(data) -> list:
+    """ The (code, normals, weights) of each type of data, for a list of Data
+    or an ArrayData
+    """
+    if hasattr(data, 'groups'):
+        return list(data.groups())
+    codes = dict.fromkeys(x.code for x in data)
+    return [(code, [x.n for x in data if x.code == code], [x.w for x in data if x.code == code]) for code in codes]
+
+
+def meanCosts(data, thetas, ks, backend: Backend = None):
+    """ The weighted mean costs of the data (a list of Data or an ArrayData) for
+    m remote stresses (thetas, ks). The data are grouped by type code, and the
+    kernel of each type is called once for all its measurements. Data sharded across
+    processes (see sharding.py) compute their costs themselves.
+    """
+    if hasattr(data, 'meanCosts'):
+        return data.meanCosts(thetas, ks)
+    backend = backend or getBackend()
+    S1, S3 = backend.principalDirections(thetas, ks)
+    total, W = None, 0
+    for code, normals, weights in groups(data):
+        costs = kernels[code](normals, weights, S1, S3, backend)
+        total = costs if total is None else backend.add(total, costs)
+        W += backend.sum(weights)
+    return backend.scale(total, 1 / W)
@@ -1,9 +1,37 @@
-from Data import Data
+from Data import Data, axialDerivatives
 import RemoteStress
 from tools import dot
 import math
+import numpy as np
 
 
 class Joint(Data):
+    __slots__ = ()
+    lipschitz = (1.0, 0.0)  # |d(n.S3)/dtheta| <= 1, and S3 does not depend on k
+
     def cost(self, r: RemoteStress) -> float:
         return 1.0 - math.fabs(dot(self.n, r.S3))
+
+    @staticmethod
+    def batchCost(normals, weights, S1, S3, backend):
+        return backend.axialCosts(normals, weights, S3)
+
+    @staticmethod
+    def batchInliers(normals, weights, S1, S3, threshold: float, backend):
+        return backend.axialInliers(normals, weights, S3, threshold)
+
+    @staticmethod
+    def batchResiduals(normals, S1, S3, backend):
+        return backend.axialResiduals(normals, S3)
+
+    @staticmethod
+    def batchDerivatives(normals, weights, theta: float, k: float):
+        # S3 is (cos(theta), -sin(theta)) and dS3/dtheta = -S1
+        c, s = math.cos(math.radians(theta)), math.sin(math.radians(theta))
+        return axialDerivatives(normals, weights, np.array((c, -s)), np.array((-s, -c)))
+
+    @staticmethod
+    def batchFit(normals):
+        # S3 is (cos(theta), -sin(theta)) (see RemoteStress.set)
+        normals = np.asarray(normals, dtype=float).reshape(-1, 2)
+        return np.degrees(np.arctan2(-normals[:, 1], normals[:, 0])) % 180
@@ -1,26 +1,172 @@
-from Data import Data
-from DataFactory import create
+from Data import meanCost
+from DataFactory import typeCode
 from myTypes import Vector
-from MonteCarlo import monteCarlo
-from plots import plotDomain
+from MonteCarlo import monteCarlo, monteCarloArrays, monteCarloStream
+from ArrayData import ArrayData
+from Ransac import ransac
+from plots import plotDomain, computeDomain
+from compaction import compact, histogram
+from RemoteStress import RemoteStress
+from cache import ResultCache
+from adaptive import adaptiveDomain
+from tiles import tiledDomain
+from tendency import tendencies
+from branchbound import branchAndBound
+from polish import polish
+from store import MeasurementStore
+import samplers
+import random as rnd
 
 
 class Model:
-    data: list[Data] = []
+    """ The measurements are stored in arrays (see store.py): self.data is a sequence of
+    read-only Data views, created when they are used
+    """
+    data: MeasurementStore
+    cache: ResultCache = None
 
-    def add(self, normal: Vector, dataType: str):
-        self.data.append(create(dataType, normal))
+    def __init__(self) -> None:
+        self.data = MeasurementStore()
+
+    def add(self, normal: Vector, dataType: str, weight: float = 1.0):
+        self.data.add(typeCode(dataType), normal, weight)
 
     def addFromFile(self, filename: str, dataType: str):
+        """ Each line is a 2D normal 'nx ny', optionally followed by a weight
+        (e.g., the length of the fracture, see images.py) and by the position 'x y'
+        of the measurement, which is used only by the spatial inversion (see spatial.py)
+        """
         f = open(filename, "r")
         for line in f:  # for each line
             tokens = line.removesuffix('\n').split(' ')
             n = [float(tokens[0]), float(tokens[1])]
-            self.add(n, dataType)
+            w = float(tokens[2]) if len(tokens) > 2 else 1.0
+            self.add(n, dataType, w)
+
+    def compact(self, tolerance: float = 0):
+        """ Merge the duplicated normals (or the ones within `tolerance` degrees)
+        into weighted representatives, see compaction.py
+        """
+        self.data = MeasurementStore.fromData(compact(self.data, tolerance))
+
+    def useCache(self, directory: str = '.inversion-cache', maxSize: int = 256 * 1024 * 1024):
+        """ Cache the results on disk (see cache.py). The inversions are cached only
+        when a seed is given, since they are random otherwise.
+        """
+        self.cache = ResultCache(directory, maxSize)
+
+    def run(self, n: int, bins: int = 0, precision: str = None, seed: int = None, checkpoint: str = None,
+            sampler: str = None, refine: bool = False):
+        """ Run the Monte Carlo inversion
+
+        Args:
+            n (int): the number of random simulations
+            bins (int, optional): if > 0, the normals are first compressed into
+                `bins` angular bins per type (see compaction.histogram), and the
+                best solution is then re-evaluated using all the data.
+            precision (str, optional): if given ('float64' or 'float32'), the data
+                are stored as arrays in this precision and the simulations are
+                evaluated by blocks (see MonteCarlo.monteCarloArrays). The deviation
+                from the float64 cost is reported for the best solution.
+            seed (int, optional): the seed of the random simulations
+            checkpoint (str, optional): the checkpoint file of the simulations. If it
+                exists, the run resumes where it stopped (see MonteCarlo.monteCarlo)
+            sampler (str, optional): the sampler of (theta, k): 'random', 'stratified',
+                'halton' or 'sobol' (see samplers.py). The data are then stored as arrays.
+            refine (bool, optional): if True, the best simulation is refined by Newton
+                steps using the analytic derivatives of the costs (see polish.py)
+
+        Returns:
+            tuple[float, float, float]: the best theta, k and (exact) cost
+        """
+        if self.cache is None or seed is None:
+            return self.invert(n, bins, precision, seed, checkpoint, sampler, refine)
+        key = self.cache.key(self.data, 'monteCarlo', n=n, bins=bins, precision=precision, seed=seed, sampler=sampler,
+                             refine=refine)
+        return self.cache.cached(key, lambda: self.invert(n, bins, precision, seed, checkpoint, sampler, refine))
+
+    def invert(self, n: int, bins: int = 0, precision: str = None, seed: int = None, checkpoint: str = None,
+               sampler: str = None, refine: bool = False):
+        """ Same as run, without the cache """
+        if seed is not None:
+            rnd.seed(seed)
+        data = self.data
+        bound = 0
+        if bins > 0:
+            data, bound = histogram(self.data, bins)
+
+        if precision is None and sampler is None:
+            # The views are created once for the whole simulation
+            theta, k, cost = monteCarlo(list(data), n, checkpoint)
+        else:
+            theta, k, cost = monteCarloArrays(ArrayData(data, precision or 'float64'), n, checkpoint=checkpoint,
+                                              sampler=sampler and samplers.create(sampler, seed=seed))
+
+        if refine:
+            theta, k, cost, iterations = polish(self.data, theta, k)
+            print(f'refined in {iterations} iterations: theta {theta}, cost {cost}')
+            return theta, k, cost
+
+        if bins <= 0 and precision in (None, 'float64'):
+            return theta, k, cost
+
+        remote = RemoteStress()
+        remote.set(theta, k)
+        exact = meanCost(self.data, remote)
+        print(f'cost {cost}, exact cost {exact}, deviation {abs(cost - exact)}' + (f' (bound {bound})' if bins > 0 else ''))
+        return theta, k, exact
+
+    def runCertified(self, tolerance: float = 1e-6) -> dict:
+        """ Deterministic inversion by branch-and-bound: the returned cost is certified to
+        be within `tolerance` of the global minimum (see branchbound.py)
+
+        Returns:
+            dict: the best theta, k and cost, the lower bound of the minimum, and the
+            number of evaluations
+        """
+        return branchAndBound(ArrayData(self.data), tolerance)
+
+    def stream(self, n: int, **options):
+        """ Async iterator over the progress events of a Monte Carlo inversion, for GUIs and
+        notebooks (see MonteCarlo.monteCarloStream)
+        """
+        return monteCarloStream(ArrayData(self.data), n, **options)
+
+    def runRobust(self, hypotheses: int = 2000, threshold: float = 0.02, precision: str = 'float64',
+                  seed: int = None):
+        """ Run the robust (RANSAC) inversion, see Ransac.py. With a seed, the result is reproducible.
+
+        Returns:
+            tuple[float, float, float, np.ndarray]: the best theta, k, cost and the mask of the inliers
+        """
+        return ransac(ArrayData(self.data, precision), hypotheses, threshold, seed=seed)
+
+    def plotDomain(self, n: int, budget: int = 0, filename: str = None, raster: bool = False):
+        """ Plot the cost over the (n, n) grid of (theta, k). If budget > 0, the cost is
+        evaluated adaptively with at most `budget` evaluations (see adaptive.py).
+        With raster=True, the domain is drawn as an image, and it is saved in
+        `filename` if given (see plots.renderDomain).
+        """
+        def compute():
+            return adaptiveDomain(self.data, n, budget) if budget > 0 else computeDomain(self.data, n)
+
+        if self.cache is None:
+            return plotDomain(self.data, n, compute(), filename, raster)
+        key = self.cache.key(self.data, 'domain', n=n, budget=budget)
+        plotDomain(self.data, n, self.cache.cached(key, compute), filename, raster)
 
-    def run(self, n: int):
-        monteCarlo(self.data, n)
+    def computeTiledDomain(self, filename: str, n: int, tile: int = 1024, processes: int = 1) -> dict:
+        """ Compute a (n, n) domain too large for the memory into a memory-mapped .npy file,
+        tile by tile (resumable, see tiles.py)
 
-    def plotDomain(self, n: int):
-        plotDomain(self.data, n)
+        Returns:
+            dict: the min, max and argmin (theta, k) of the domain
+        """
+        return tiledDomain(ArrayData(self.data), filename, n, tile, processes)
 
+    def tendencies(self, remotes, bins: int = 50) -> dict:
+        """ The slip and dilation tendencies of all the fractures of the model for an inverted
+        RemoteStress, or a list of them (see tendency.py)
+        """
+        data = ArrayData(self.data)
+        return tendencies(remotes, data.normals, data.weights, bins=bins)
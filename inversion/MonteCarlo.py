@@ -1,24 +1,191 @@
+import os
+import json
+import math
+import time
+import pickle
+import hashlib
+import numpy as np
+import asyncio
+import threading
 import Data
 import random as rnd
-import functools
+from Data import meanCost
 from RemoteStress import RemoteStress
 from tools import lerp
+from ArrayData import ArrayData
+from backends import Backend, getBackend
+from DataFactory import groups, meanCosts
+from samplers import Sampler
+
+
+def runKey(data, algorithm: str, n: int, batch: int = None, sampler: Sampler = None, **params) -> str:
+    """ The key of a simulation: a hash of the measurements (type codes, normals and
+    weights), of the algorithm, of n, of the batch size, of the type of the sampler and
+    of the other parameters (JSON values)
+    """
+    h = hashlib.sha256()
+    for code, normals, weights in sorted(groups(data), key=lambda g: g[0]):
+        normals = np.asarray(normals)
+        h.update(json.dumps([int(code), normals.dtype.str]).encode())
+        h.update(np.ascontiguousarray(normals).tobytes())
+        h.update(np.ascontiguousarray(weights, dtype=float).tobytes())
+    key = [algorithm, n, batch, None if sampler is None else type(sampler).__name__]
+    h.update(json.dumps(key + ([sorted(params.items())] if params else [])).encode())
+    return h.hexdigest()
+
+
+def saveCheckpoint(filename: str, i: int, best: tuple, sampler: Sampler = None, run: str = None) -> None:
+    """ Save the state of a simulation: the number of simulations done, the state of
+    the random generator (and of the sampler), the best (cost, theta, k) so far and the
+    key of the run (see runKey). The file is written atomically (temporary file, then
+    renamed), so a killed run never leaves it half-written.
+    """
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump({'i': i, 'random': rnd.getstate(), 'best': best, 'sampler': sampler, 'run': run}, f)
+    os.replace(tmp, filename)
+
+
+def loadCheckpoint(filename: str, best: tuple, sampler: Sampler = None, run: str = None) -> tuple[int, tuple, Sampler]:
+    """ Restore the state saved by saveCheckpoint, if the file exists and was saved by
+    the same run (see runKey). A checkpoint of another run is ignored (and overwritten
+    by the next checkpoint).
+
+    Returns:
+        tuple[int, tuple, Sampler]: the number of simulations already done, the best
+        (cost, theta, k) and the sampler
+    """
+    if filename is None or not os.path.exists(filename):
+        return 0, best, sampler
+    with open(filename, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('run') != run:
+        print(f'ignoring {filename}: saved by another run (data, n, batch or sampler)')
+        return 0, best, sampler
+    rnd.setstate(state['random'])
+    print('resuming from', filename, 'after', state['i'], 'simulations')
+    return state['i'], state['best'], state['sampler'] or sampler
 
 
 # Simulation aléatoire pour trouver la solution
-def monteCarlo(data: list[Data], n: int = 5000):
+def monteCarlo(data: list[Data], n: int = 5000, checkpoint: str = None, every: int = 100000):
     """ Monte Carlo simulation (random)
 
     Args:
         data (list[Data]): a list of Data
         n (int, optional): The number of random simulations. Defaults to 5000.
+        checkpoint (str, optional): The checkpoint file. If it exists, the simulation resumes
+            where it stopped, and gives the same result as an uninterrupted run. Defaults to None.
+        every (int, optional): The number of simulations between two checkpoints. Defaults to 100000.
+
+    Returns:
+        tuple[float, float, float]: the best theta, k and cost
     """
-    cost, theta, k = 1e9, 0, 0
+    run = runKey(data, 'monteCarlo', n) if checkpoint is not None else None
+    start, (cost, theta, k), _ = loadCheckpoint(checkpoint, (1e9, 0, 0), run=run)
     remote = RemoteStress()
-    for i in range(0, n):
+    for i in range(start, n):
+        if checkpoint is not None and i > start and i % every == 0:
+            saveCheckpoint(checkpoint, i, (cost, theta, k), run=run)
         theta_, k_ = lerp(0, 180, rnd.random()), lerp(0, 1, rnd.random())
         remote.set(theta_, k_)
-        c = functools.reduce(lambda a, b: a + b, [x.cost(remote) for x in data], 0) / len(data)
+        c = meanCost(data, remote)
         if c < cost:
             cost, theta, k = c, theta_, k_
             print(theta, k, c)
+    if checkpoint is not None:
+        saveCheckpoint(checkpoint, max(start, n), (cost, theta, k), run=run)
+    return theta, k, cost
+
+
+def monteCarloArrays(data: ArrayData, n: int = 5000, batch: int = 10000, checkpoint: str = None, every: int = 10,
+                     sampler: Sampler = None):
+    """ Same as monteCarlo, but the random simulations are evaluated by blocks
+    of `batch` stresses using the vectorized backend (see backends.py)
+
+    Args:
+        data (ArrayData): the data stored as arrays
+        n (int, optional): The number of random simulations. Defaults to 5000.
+        batch (int, optional): The number of simulations evaluated at once. Defaults to 10000.
+        checkpoint (str, optional): The checkpoint file (see monteCarlo). Defaults to None.
+        every (int, optional): The number of batches between two checkpoints. Defaults to 10.
+        sampler (Sampler, optional): The sampler of (theta, k), e.g. a quasi-random one (see
+            samplers.py). Defaults to None, i.e., the same random draws as monteCarlo.
+
+    Returns:
+        tuple[float, float, float]: the best theta, k and cost
+    """
+    for event in monteCarloEvents(data, n, batch, checkpoint, every, sampler):
+        print(event['theta'], event['k'], event['cost'])
+    return event['theta'], event['k'], event['cost']
+
+
+def monteCarloEvents(data: ArrayData, n: int = 5000, batch: int = 10000, checkpoint: str = None, every: int = 10,
+                     sampler: Sampler = None, interval: float = 0.5, stop: threading.Event = None,
+                     backend: Backend = None):
+    """ Generator version of monteCarloArrays: yields progress events at most every `interval`
+    seconds, and a last one when the simulation is done. An event is a dict with the best
+    'theta', 'k' and 'cost' so far, the number of 'evaluations' (out of 'total'), the 'rate'
+    (evaluations per second) and 'done'. If `stop` is given, the simulation ends (without
+    a last event) at the first batch after it is set.
+    """
+    run = runKey(data, 'monteCarloArrays', n, batch, sampler) if checkpoint is not None else None
+    first, (cost, theta, k), sampler = loadCheckpoint(checkpoint, (1e9, 0, 0), sampler, run)
+    backend = backend or getBackend()
+    begin, last = time.perf_counter(), -math.inf
+
+    def event(evaluations: int, done: bool) -> dict:
+        rate = (evaluations - first) / max(time.perf_counter() - begin, 1e-9)
+        return {'theta': theta, 'k': k, 'cost': cost, 'evaluations': evaluations, 'total': n, 'rate': rate, 'done': done}
+
+    for start in range(first, n, batch):
+        if stop is not None and stop.is_set():
+            return
+        if checkpoint is not None and start > first and (start // batch) % every == 0:
+            saveCheckpoint(checkpoint, start, (cost, theta, k), sampler, run)
+        if sampler is None:
+            samples = [(lerp(0, 180, rnd.random()), lerp(0, 1, rnd.random())) for _ in range(min(batch, n - start))]
+            thetas, ks = zip(*samples)
+        else:
+            u = sampler.sample(min(batch, n - start))
+            thetas, ks = lerp(0, 180, u[:, 0]), lerp(0, 1, u[:, 1])
+        costs = meanCosts(data, thetas, ks, backend)
+        i = backend.argmin(costs)
+        if costs[i] < cost:
+            cost, theta, k = float(costs[i]), float(thetas[i]), float(ks[i])
+        if time.perf_counter() - last >= interval and start + batch < n:
+            last = time.perf_counter()
+            yield event(start + len(costs), False)
+    if checkpoint is not None:
+        saveCheckpoint(checkpoint, max(first, n), (cost, theta, k), sampler, run)
+    yield event(max(first, n), True)
+
+
+async def monteCarloStream(data: ArrayData, n: int = 5000, **options):
+    """ Async iterator version of monteCarloEvents: the simulation runs in a worker thread
+    (the vectorized costs release the GIL), and the events are yielded to the event loop, e.g.
+
+        async for event in monteCarloStream(data, 10**7, interval=0.1):
+            update(event)
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    # The backend is resolved here, not in the worker thread (see backends.py)
+    backend = options.pop('backend', None) or getBackend()
+
+    def run():
+        try:
+            for event in monteCarloEvents(data, n, stop=stop, backend=backend, **options):
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    worker = loop.run_in_executor(None, run)
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+    finally:
+        # The consumer stopped early (break, aclose or cancellation): stop the simulation
+        stop.set()
+        await worker  # raises the exception of the simulation, if any
@@ -0,0 +1,60 @@
+import numpy as np
+from ArrayData import ArrayData
+from DataFactory import classes
+from MonteCarlo import monteCarloArrays
+from backends import getBackend
+from samplers import RandomSampler
+
+
+def ransac(data: ArrayData, hypotheses: int = 2000, threshold: float = 0.02, refit: int = 1000, seed: int = None):
+    """ Robust inversion (RANSAC): the outliers (misassigned or mismeasured
+    fractures) do not drag the solution.
+
+    1. Each hypothesis is fitted to a minimal subset. Since the cost of one
+       measurement is zero for a single orientation theta (see Data.batchFit),
+       a minimal subset is one measurement (drawn according to the weights),
+       and k is drawn at random.
+    2. All the hypotheses are scored at once: the weighted number of
+       measurements with a cost 1 - |n.S| <= threshold (one kernel call per type).
+    3. The best hypothesis gives the consensus set (its inliers), on which the
+       stress is refitted using the Monte Carlo method.
+
+    Args:
+        data (ArrayData): the data stored as arrays
+        hypotheses (int, optional): The number of hypotheses. Defaults to 2000.
+        threshold (float, optional): The max cost of an inlier. Defaults to 0.02 (about 11 degrees).
+        refit (int, optional): The number of simulations of the refit. Defaults to 1000.
+        seed (int, optional): The seed of the random draws. Defaults to None.
+
+    Returns:
+        tuple[float, float, float, np.ndarray]: the best theta, k, cost (on the
+        consensus set) and the mask of the inliers
+    """
+    rng = np.random.default_rng(seed)
+    backend = getBackend()
+
+    # 1. Minimal subsets
+    picks = rng.choice(len(data), size=hypotheses, p=data.weights / data.weights.sum())
+    thetas = np.empty(hypotheses)
+    for code in np.unique(data.types[picks]):
+        selected = data.types[picks] == code
+        thetas[selected] = classes[code].batchFit(data.normals[picks[selected]])
+    ks = rng.random(hypotheses)
+
+    # 2. Scoring
+    S1, S3 = backend.principalDirections(thetas, ks)
+    scores = np.zeros(hypotheses)
+    for code, normals, weights in data.groups():
+        scores += np.asarray(classes[code].batchInliers(normals, weights, S1, S3, threshold, backend))
+    best = int(np.argmax(scores))
+    print('best hypothesis:', thetas[best], ks[best], 'inliers:', scores[best] / data.weights.sum())
+
+    # 3. Consensus set and refit
+    inliers = np.zeros(len(data), dtype=bool)
+    for code in np.unique(data.types):
+        selected = data.types == code
+        residuals = classes[code].batchResiduals(data.normals[selected], S1[best], S3[best], backend)
+        inliers[selected] = np.asarray(residuals) <= threshold
+    # The refit draws from a sampler seeded by rng, so that the result depends only on the seed
+    theta, k, cost = monteCarloArrays(data.subset(inliers), refit, sampler=RandomSampler(int(rng.integers(2**32))))
+    return theta, k, cost, inliers
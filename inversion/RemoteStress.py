@@ -6,6 +6,16 @@ import math
 class RemoteStress:
     __S1: Vector
     __S3: Vector
+    __theta: float = 0
+    __k: float = 0
+
+    @property
+    def theta(self) -> float:
+        return self.__theta
+
+    @property
+    def k(self) -> float:
+        return self.__k
 
     @property
     def S1(self) -> Vector:
@@ -16,11 +26,15 @@ class RemoteStress:
         return self.__S3
 
     def set(self, theta: float, k: float) -> None:
+        self.__theta, self.__k = theta, k
         a = math.radians(theta)
         c, s = math.cos(a), math.sin(a)
-        xx, xy, yy = k * s * s, k * c * s, k * c * c
-        trace = xx + yy
-        discri = math.sqrt(trace * trace - 4 * (xx * yy - xy * xy))
-        # Decreasing order according to the eigen values
-        self.__S1 = normalize([xy, (trace + discri) / 2 - xx])
-        self.__S3 = normalize([xy, (trace - discri) / 2 - xx])
\ No newline at end of file
+        # The stress k (s, c) (s, c)^T has the eigen values k along (s, c) and 0 along
+        # (c, -s), in closed form so that no direction is null (e.g. S3 at theta = 0).
+        # Decreasing order according to the eigen values, null directions if k = 0.
+        if k > 0:
+            self.__S1, self.__S3 = [s, c], [c, -s]
+        elif k < 0:
+            self.__S1, self.__S3 = [c, -s], [s, c]
+        else:
+            self.__S1, self.__S3 = [0.0, 0.0], [0.0, 0.0]
@@ -1,10 +1,37 @@
-from Data import Data
+from Data import Data, axialDerivatives
 import RemoteStress
 from tools import dot
 import math
+import numpy as np
 
 
 class Stylolite(Data):
+    __slots__ = ()
+    lipschitz = (1.0, 0.0)  # |d(n.S1)/dtheta| <= 1, and S1 does not depend on k
+
     def cost(self, r: RemoteStress) -> float:
         return 1.0 - math.fabs(dot(self.n, r.S1))
 
+    @staticmethod
+    def batchCost(normals, weights, S1, S3, backend):
+        return backend.axialCosts(normals, weights, S1)
+
+    @staticmethod
+    def batchInliers(normals, weights, S1, S3, threshold: float, backend):
+        return backend.axialInliers(normals, weights, S1, threshold)
+
+    @staticmethod
+    def batchResiduals(normals, S1, S3, backend):
+        return backend.axialResiduals(normals, S1)
+
+    @staticmethod
+    def batchDerivatives(normals, weights, theta: float, k: float):
+        # S1 is (sin(theta), cos(theta)) and dS1/dtheta = S3
+        c, s = math.cos(math.radians(theta)), math.sin(math.radians(theta))
+        return axialDerivatives(normals, weights, np.array((s, c)), np.array((c, -s)))
+
+    @staticmethod
+    def batchFit(normals):
+        # S1 is (sin(theta), cos(theta)) (see RemoteStress.set)
+        normals = np.asarray(normals, dtype=float).reshape(-1, 2)
+        return np.degrees(np.arctan2(normals[:, 0], normals[:, 1])) % 180
@@ -0,0 +1,100 @@
+import numpy as np
+from DataFactory import meanCosts
+from tools import lerp
+
+
+class Quadtree:
+    """ Adaptive evaluation of the cost over (theta, k) in [0, 180] x [min_, max_]
+
+    The corners of the cells are on a lattice of (2^depth + 1)^2 points, and each
+    evaluated point is stored only once (the cells share their corners). The cells
+    where the cost varies a lot or is close to the minimum are refined first.
+    """
+
+    def __init__(self, data, min_: float = 0.001, max_: float = 0.99, depth: int = 12) -> None:
+        self.data = data
+        self.min_, self.max_ = min_, max_
+        self.size = 1 << depth
+        self.values: dict[tuple[int, int], float] = {}
+        self.leaves: list[tuple[int, int, int]] = []  # (i, j, width) in lattice units
+
+    def evaluate(self, points: list[tuple[int, int]]) -> None:
+        """ Evaluate the new points with one call to the vectorized costs """
+        points = [p for p in dict.fromkeys(points) if p not in self.values]
+        if not points:
+            return
+        i, j = np.array(points).T
+        costs = meanCosts(self.data, lerp(0, 180, i / self.size), lerp(self.min_, self.max_, j / self.size))
+        self.values.update(zip(points, np.asarray(costs, dtype=float)))
+
+    def corners(self, cell: tuple[int, int, int]) -> list[float]:
+        i, j, w = cell
+        return [self.values[p] for p in ((i, j), (i + w, j), (i, j + w), (i + w, j + w))]
+
+    def split(self, cell: tuple[int, int, int]) -> list[tuple[int, int, int]]:
+        i, j, w = cell
+        h = w // 2
+        return [(i, j, h), (i + h, j, h), (i, j + h, h), (i + h, j + h, h)]
+
+    def cellPoints(self, cell: tuple[int, int, int]) -> list[tuple[int, int]]:
+        i, j, w = cell
+        return [(i + a, j + b) for a in (0, w) for b in (0, w)]
+
+    def build(self, budget: int = 2000, start: int = 4, batch: int = 64) -> int:
+        """ Refine the cells until `budget` costs have been evaluated
+
+        Args:
+            budget (int, optional): The total number of evaluations. Defaults to 2000.
+            start (int, optional): The initial number of cells per axis (a power of 2). Defaults to 4.
+            batch (int, optional): The number of cells refined at each step. Defaults to 64.
+
+        Returns:
+            int: the number of evaluations
+        """
+        w = self.size // start
+        self.leaves = [(i, j, w) for i in range(0, self.size, w) for j in range(0, self.size, w)]
+        self.evaluate([p for cell in self.leaves for p in self.cellPoints(cell)])
+
+        while len(self.values) < budget:
+            values = np.fromiter(self.values.values(), dtype=float)
+            zmin, zrange = values.min(), max(values.max() - values.min(), 1e-300)
+            candidates = [cell for cell in self.leaves if cell[2] > 1]
+            if not candidates:
+                break
+            # Variation of the cost inside the cell, and proximity of the cell to the minimum
+            corners = np.array([self.corners(cell) for cell in candidates])
+            spread = (corners.max(axis=1) - corners.min(axis=1)) / zrange
+            proximity = 1 - (corners.min(axis=1) - zmin) / zrange
+            widths = np.array([cell[2] for cell in candidates]) / self.size
+            priority = widths * (spread + proximity)
+            # Each split evaluates at most 5 new points
+            count = max(1, min(batch, (budget - len(self.values)) // 5))
+            refined = [candidates[c] for c in np.argsort(-priority)[:count]]
+            children = [child for cell in refined for child in self.split(cell)]
+            self.evaluate([p for cell in children for p in self.cellPoints(cell)])
+            refined = set(refined)
+            self.leaves = [cell for cell in self.leaves if cell not in refined] + children
+        return len(self.values)
+
+    def resample(self, n: int) -> np.ndarray:
+        """ The (n, n) regular grid Z[j][i] (theta_j, k_i) interpolated bilinearly in the leaves """
+        Z = np.zeros(shape=(n, n))
+        x = np.linspace(0, self.size, n)  # the grid in lattice units
+        for cell in self.leaves:
+            i, j, w = cell
+            a = slice(np.searchsorted(x, i), np.searchsorted(x, i + w, 'right'))
+            b = slice(np.searchsorted(x, j), np.searchsorted(x, j + w, 'right'))
+            u, v = (x[a] - i) / w, (x[b] - j) / w
+            z00, z10, z01, z11 = self.corners(cell)
+            u, v = u[:, None], v[None, :]
+            Z[a, b] = (1 - u) * (1 - v) * z00 + u * (1 - v) * z10 + (1 - u) * v * z01 + u * v * z11
+        return Z
+
+
+def adaptiveDomain(data, n: int, budget: int = 2000, min_: float = 0.001, max_: float = 0.99) -> np.ndarray:
+    """ Same as plots.computeDomain, but with at most `budget` evaluations of the cost,
+    refined near the minimum and where the cost varies, and resampled on the (n, n) grid
+    """
+    tree = Quadtree(data, min_, max_)
+    tree.build(budget)
+    return tree.resample(n)
@@ -0,0 +1,330 @@
+import os
+import math
+import time
+import random as rnd
+import warnings
+from RemoteStress import RemoteStress
+from tools import dot
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# ------------------------------------------------------------------
+#  Backends: the same kernels, implemented several ways
+# ------------------------------------------------------------------
+
+class Backend:
+    """ The core kernels of the inversion:
+    - principalDirections: the S1 and S3 directions of m remote stresses (theta, k)
+    - axialCosts: sum of w * (1 - |n.a|) over the n normals, for each of the m axes
+    - axialInliers: sum of w over the n normals such that 1 - |n.a| <= threshold, for each of the m axes
+    - axialResiduals: the n values 1 - |n.a| for one axis a
+    - sum, argmin: the reductions
+    - add, scale: element-wise operations on the arrays of costs
+    """
+    name: str = ''
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def principalDirections(self, thetas, ks): pass
+
+    def axialCosts(self, normals, weights, axes): pass
+
+    def axialInliers(self, normals, weights, axes, threshold: float): pass
+
+    def axialResiduals(self, normals, axis): pass
+
+    def sum(self, values) -> float: pass
+
+    def argmin(self, values) -> int: pass
+
+    def add(self, a, b): pass
+
+    def scale(self, a, s: float): pass
+
+
+class PythonBackend(Backend):
+    name = 'python'
+
+    def principalDirections(self, thetas, ks):
+        remote = RemoteStress()
+        S1, S3 = [], []
+        for theta, k in zip(thetas, ks):
+            remote.set(theta, k)
+            S1.append(remote.S1)
+            S3.append(remote.S3)
+        return S1, S3
+
+    def axialCosts(self, normals, weights, axes):
+        return [sum(w * (1.0 - math.fabs(dot(n, a))) for n, w in zip(normals, weights)) for a in axes]
+
+    def axialInliers(self, normals, weights, axes, threshold: float):
+        return [sum(w for n, w in zip(normals, weights) if 1.0 - math.fabs(dot(n, a)) <= threshold) for a in axes]
+
+    def axialResiduals(self, normals, axis):
+        return [1.0 - math.fabs(dot(n, axis)) for n in normals]
+
+    def sum(self, values) -> float:
+        return math.fsum(values)
+
+    def argmin(self, values) -> int:
+        return min(range(len(values)), key=values.__getitem__)
+
+    def add(self, a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    def scale(self, a, s: float):
+        return [x * s for x in a]
+
+
+class NumpyBackend(Backend):
+    name = 'numpy'
+    chunk: int = 1 << 22  # max number of (normal, axis) pairs computed at once
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    def principalDirections(self, thetas, ks):
+        a = np.radians(np.asarray(thetas, dtype=float))
+        k = np.asarray(ks, dtype=float)
+        # Closed form, as RemoteStress.set: (s, c) and (c, -s) in decreasing order of the
+        # eigen values (reversed if k < 0), null directions if k = 0
+        m = np.sign(k)[:, None]
+        u = m * np.column_stack((np.sin(a), np.cos(a)))
+        v = m * np.column_stack((np.cos(a), -np.sin(a)))
+        negative = k[:, None] < 0
+        return np.where(negative, v, u), np.where(negative, u, v)
+
+    def axialCosts(self, normals, weights, axes):
+        normals = asNormals(normals)
+        weights = np.asarray(weights, dtype=float)
+        axes = np.asarray(axes, dtype=normals.dtype).reshape(-1, 2)
+        result = np.empty(len(axes))
+        total = weights.sum()
+        step = max(1, self.chunk // max(1, len(normals)))
+        for i in range(0, len(axes), step):
+            # (n, step) matrix of |n.a| in the precision of the normals, reduced with the weights
+            dots = np.abs(normals @ axes[i:i + step].T)
+            if dots.dtype == np.float32:
+                # reduced precision: the sums are still accumulated in float64
+                weighted = dots * weights.astype(np.float32)[:, None]
+                result[i:i + step] = total - np.sum(weighted, axis=0, dtype=np.float64)
+            else:
+                result[i:i + step] = total - weights @ dots
+        return result
+
+    def axialInliers(self, normals, weights, axes, threshold: float):
+        # For unit normals, 1 - |n.a| <= threshold <=> the angle between the lines of n and a is
+        # <= acos(1 - threshold).
+        # The orientations of the normals are sorted once, and each axis counts the weights
+        # in its angular window: O((n + m) log n) instead of O(n m)
+        normals = asNormals(normals)
+        weights = np.asarray(weights, dtype=float)
+        axes = np.asarray(axes, dtype=float).reshape(-1, 2)
+        if threshold >= 1:
+            return np.full(len(axes), weights.sum())
+        delta = math.acos(max(1.0 - threshold, -1.0))
+        angles = np.arctan2(normals[:, 1], normals[:, 0]).astype(float) % np.pi
+        order = np.argsort(angles)
+        # The orientations are periodic: copies shifted by -pi and +pi for the windows crossing 0 or pi
+        angles = np.concatenate((angles[order] - np.pi, angles[order], angles[order] + np.pi))
+        cumulated = np.concatenate(([0], np.cumsum(np.tile(weights[order], 3))))
+        a = np.arctan2(axes[:, 1], axes[:, 0]) % np.pi
+        result = cumulated[np.searchsorted(angles, a + delta, 'right')] - cumulated[np.searchsorted(angles, a - delta, 'left')]
+        result[np.hypot(axes[:, 0], axes[:, 1]) == 0] = 0  # null directions: the costs are 1
+        return result
+
+    def axialResiduals(self, normals, axis):
+        normals = asNormals(normals)
+        return 1.0 - np.abs(normals @ np.asarray(axis, dtype=normals.dtype))
+
+    def sum(self, values) -> float:
+        return float(np.sum(values))
+
+    def argmin(self, values) -> int:
+        return int(np.argmin(values))
+
+    def add(self, a, b):
+        return np.add(a, b)
+
+    def scale(self, a, s: float):
+        return np.multiply(a, s)
+
+
+def asNormals(normals):
+    """ The normals as a (n, 2) array, kept in float32 if they are, float64 otherwise """
+    normals = np.asarray(normals)
+    if normals.dtype != np.float32:
+        normals = normals.astype(float)
+    return normals.reshape(-1, 2)
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def jitAxialCosts(normals, weights, axes):
+        result = np.empty(axes.shape[0])
+        for j in numba.prange(axes.shape[0]):
+            s = 0.0  # float64 accumulator, whatever the precision of the normals
+            for i in range(normals.shape[0]):
+                s += weights[i] * (1.0 - abs(normals[i, 0] * axes[j, 0] + normals[i, 1] * axes[j, 1]))
+            result[j] = s
+        return result
+
+
+class JitBackend(NumpyBackend):
+    """ Same as NumpyBackend, but the cost loop is compiled with numba (if installed) """
+    name = 'jit'
+
+    def __init__(self) -> None:
+        # The default threading layer (TBB) hangs at exit when the process forks after using
+        # it (e.g. a Pool after a first inversion) or first uses it in a thread. Set only
+        # when the backend is used, before its first parallel call.
+        numba.config.THREADING_LAYER = 'workqueue'
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None and numba is not None
+
+    def axialCosts(self, normals, weights, axes):
+        normals = np.ascontiguousarray(asNormals(normals))
+        return jitAxialCosts(normals,
+                             np.ascontiguousarray(weights, dtype=float),
+                             np.ascontiguousarray(axes, dtype=normals.dtype).reshape(-1, 2))
+
+
+# ------------------------------------------------------------------
+#  Registry
+# ------------------------------------------------------------------
+
+backends: dict[str, type] = {
+    'python': PythonBackend,
+    'numpy': NumpyBackend,
+    'jit': JitBackend
+}
+
+# When a backend is not usable, try the next ones in this order. The jit backend is
+# only used when requested (setBackend('jit') or INVERSION_BACKEND=jit).
+fallbacks = ['numpy', 'python']
+
+current: Backend = None
+
+
+def register(name: str, backend: type, fallback: bool = False):
+    """ Add a new backend. If `fallback` is True, it is tried first when the
+    requested backend is not usable.
+    """
+    backends[name] = backend
+    if fallback:
+        fallbacks.insert(0, name)
+
+
+def conformance(backend: Backend, tolerance: float = 1e-9) -> bool:
+    """ The test every backend must pass: compare its kernels to the reference
+    (pure Python) implementation on a fixed set of stresses and normals.
+    """
+    reference = PythonBackend()
+    thetas = [0, 10, 30, 45, 60, 90, 120, 135, 170, 180, 77.7, 0]
+    ks = [0, 0.1, 0.25, 0.5, 0.75, 1, 0.3, 0.9, 0.6, 0.001, 0.42, 0.8]
+    normals = [[1, 0], [0, 1], [0.6, 0.8], [-0.8, 0.6], [math.cos(1), math.sin(1)]]
+    weights = [1, 2, 0.5, 1, 3]
+
+    def close(a, b) -> bool:
+        return math.fabs(float(a) - float(b)) <= tolerance * max(1.0, math.fabs(float(b)))
+
+    S1, S3 = backend.principalDirections(thetas, ks)
+    R1, R3 = reference.principalDirections(thetas, ks)
+    for u, v in zip(list(S1) + list(S3), R1 + R3):
+        # The directions are defined up to their sign
+        if not (close(u[0], v[0]) and close(u[1], v[1])) and not (close(-u[0], v[0]) and close(-u[1], v[1])):
+            return False
+
+    costs = backend.axialCosts(normals, weights, R3)
+    expected = reference.axialCosts(normals, weights, R3)
+    if len(costs) != len(expected) or not all(close(a, b) for a, b in zip(costs, expected)):
+        return False
+
+    inliers = backend.axialInliers(normals, weights, R3, 0.3)
+    if not all(close(a, b) for a, b in zip(inliers, reference.axialInliers(normals, weights, R3, 0.3))):
+        return False
+
+    residuals = backend.axialResiduals(normals, R3[4])
+    if not all(close(a, b) for a, b in zip(residuals, reference.axialResiduals(normals, R3[4]))):
+        return False
+
+    total = backend.scale(backend.add(costs, costs), 0.5)
+    if not all(close(a, b) for a, b in zip(total, expected)):
+        return False
+
+    return close(backend.sum(expected), reference.sum(expected)) and \
+        backend.argmin(expected) == reference.argmin(expected)
+
+
+def create(name: str) -> Backend:
+    """ Create the backend `name` if it is installed and passes the conformance test,
+    otherwise return None
+    """
+    if name not in backends:
+        raise Exception(f'backend {name} is unknown!')
+    if not backends[name].available():
+        return None
+    backend = backends[name]()
+    try:
+        if conformance(backend):
+            return backend
+    except Exception:
+        pass
+    warnings.warn(f'backend {name} failed the conformance test')
+    return None
+
+
+def setBackend(name: str = None) -> Backend:
+    """ Select the backend `name`, or the first usable one of `fallbacks` """
+    global current
+    for n in ([name] if name else []) + [f for f in fallbacks if f != name]:
+        backend = create(n)
+        if backend is not None:
+            if name and n != name:
+                warnings.warn(f'backend {name} is not usable, using {n}')
+            current = backend
+            return current
+    raise Exception('no usable backend!')
+
+
+def getBackend() -> Backend:
+    """ The current backend. Default is given by the environment variable
+    INVERSION_BACKEND, or the first usable one of `fallbacks`.
+    """
+    if current is None:
+        setBackend(os.environ.get('INVERSION_BACKEND'))
+    return current
+
+
+def benchmark(n: int = 10000, m: int = 1000) -> dict[str, float]:
+    """ The time (in seconds) taken by each usable backend to evaluate the costs of
+    n normals for m remote stresses, in order to choose the fastest on this machine.
+    """
+    thetas = [rnd.random() * 180 for _ in range(m)]
+    ks = [rnd.random() for _ in range(m)]
+    normals = [[math.cos(a), math.sin(a)] for a in (rnd.random() * math.pi for _ in range(n))]
+    weights = [1.0] * n
+    timings = {}
+    for name in backends:
+        backend = create(name)
+        if backend is None:
+            continue
+        start = time.perf_counter()
+        S1, S3 = backend.principalDirections(thetas, ks)
+        backend.argmin(backend.axialCosts(normals, weights, S3))
+        timings[name] = time.perf_counter() - start
+    return timings
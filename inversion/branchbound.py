@@ -0,0 +1,74 @@
+import heapq
+import math
+import numpy as np
+from DataFactory import classes, groups, meanCosts
+
+
+def lipschitzConstants(data) -> tuple[float, float]:
+    """ The Lipschitz constants (theta in degrees, k) of the weighted mean cost of the data:
+    a weighted mean of costs is bounded by the largest constants of its types
+    """
+    constants = [classes[code].lipschitz for code, _, _ in groups(data)]
+    return math.radians(max(c[0] for c in constants)), max(c[1] for c in constants)
+
+
+def branchAndBound(data, tolerance: float = 1e-6, min_: float = 0.001, max_: float = 0.99,
+                   batch: int = 64, maxEvaluations: int = 1000000) -> dict:
+    """ Deterministic global minimization of the mean cost over [0, 180] x [min_, max_]
+
+    Each cell of the box is evaluated at its center c, and since the cost is Lipschitz,
+    cost(x) >= cost(c) - Ltheta |dtheta| - Lk |dk| bounds it from below in the cell. The
+    cell with the smallest bound is split (along the axis where the bound is the loosest),
+    and the cells whose bound exceeds the best cost found are never split again. When all
+    the bounds are above best - tolerance, the best cost is certified to be within
+    `tolerance` of the global minimum.
+
+    Args:
+        data: a list of Data or an ArrayData
+        tolerance (float, optional): the certified accuracy of the cost. Defaults to 1e-6.
+        batch (int, optional): the number of cells split at each step, whose children are
+            evaluated with one call to meanCosts. Defaults to 64.
+        maxEvaluations (int, optional): the max number of evaluations. Defaults to 1000000.
+
+    Returns:
+        dict: 'theta', 'k' and 'cost' of the best point, 'bound': the lower bound of the
+        global minimum, 'certified': True if cost - bound <= tolerance, and 'evaluations'
+    """
+    Ltheta, Lk = lipschitzConstants(data)
+
+    def evaluate(cells: list[tuple]) -> list[tuple]:
+        thetas = [(c[0] + c[1]) / 2 for c in cells]
+        ks = [(c[2] + c[3]) / 2 for c in cells]
+        costs = np.asarray(meanCosts(data, thetas, ks), dtype=float)
+        return [(float(f) - Ltheta * (c[1] - c[0]) / 2 - Lk * (c[3] - c[2]) / 2, float(f), c)
+                for f, c in zip(costs, cells)]
+
+    heap = evaluate([(0.0, 180.0, min_, max_)])
+    best = min(heap, key=lambda e: e[1])
+    evaluations, dropped = 1, math.inf
+    while heap and heap[0][0] < best[1] - tolerance and evaluations < maxEvaluations:
+        children = []
+        while heap and len(children) < 2 * batch and heap[0][0] < best[1] - tolerance:
+            _, _, (t0, t1, k0, k1) = heapq.heappop(heap)
+            if Ltheta * (t1 - t0) >= Lk * (k1 - k0):
+                tm = (t0 + t1) / 2
+                children += [(t0, tm, k0, k1), (tm, t1, k0, k1)]
+            else:
+                km = (k0 + k1) / 2
+                children += [(t0, t1, k0, km), (t0, t1, km, k1)]
+        evaluated = evaluate(children)
+        evaluations += len(evaluated)
+        best = min(best, min(evaluated, key=lambda e: e[1]), key=lambda e: e[1])
+        # The cells that cannot contain a better point are dropped
+        for entry in evaluated:
+            if entry[0] < best[1] - tolerance:
+                heapq.heappush(heap, entry)
+            else:
+                dropped = min(dropped, entry[0])
+
+    t0, t1, k0, k1 = best[2]
+    bound = min(heap[0][0] if heap else math.inf, dropped, best[1])
+    return {
+        'theta': (t0 + t1) / 2, 'k': (k0 + k1) / 2, 'cost': best[1],
+        'bound': bound, 'certified': best[1] - bound <= tolerance, 'evaluations': evaluations
+    }
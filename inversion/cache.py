@@ -0,0 +1,81 @@
+import os
+import glob
+import json
+import pickle
+import hashlib
+import numpy as np
+from ArrayData import ArrayData
+
+
+def codeVersion() -> str:
+    """ A hash of the sources of the inversion: any change of the code invalidates the results """
+    h = hashlib.sha256()
+    for filename in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(filename, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """ A content-addressed cache of the results on disk: the key hashes the measurements
+    (normals, types and weights), the algorithm, its parameters and the code version.
+    When the total size exceeds `maxSize` bytes, the least recently used results are removed.
+    """
+    directory: str
+    maxSize: int
+
+    def __init__(self, directory: str = '.inversion-cache', maxSize: int = 256 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.maxSize = maxSize
+        self.version = codeVersion()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data, algorithm: str, **params) -> str:
+        if not isinstance(data, ArrayData):
+            data = ArrayData(data)
+        h = hashlib.sha256()
+        for array in (data.normals, data.types, data.weights):
+            h.update(array.dtype.str.encode())
+            h.update(np.ascontiguousarray(array).tobytes())
+        h.update(json.dumps([algorithm, params, self.version], sort_keys=True).encode())
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key: str):
+        """ The cached result, or None """
+        try:
+            with open(self.path(key), 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(self.path(key))  # most recently used
+        return result
+
+    def put(self, key: str, result) -> None:
+        # Write in a temporary file, then rename: a result is never read half-written
+        tmp = self.path(key) + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    def cached(self, key: str, compute):
+        """ The cached result for the key, or compute() which is then cached """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def evict(self) -> None:
+        """ Remove the least recently used results until the size is <= maxSize """
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+        entries = sorted((os.stat(f).st_mtime, os.stat(f).st_size, f) for f in files)
+        size = sum(entry[1] for entry in entries)
+        for _, s, f in entries:
+            if size <= self.maxSize:
+                break
+            os.remove(f)
+            size -= s
@@ -0,0 +1,107 @@
+from Data import Data
+from DataFactory import classes
+import math
+
+
+def axialAngle(n) -> float:
+    """ The orientation of a normal in [0, 180[ (n and -n have the same cost) """
+    return math.degrees(math.atan2(n[1], n[0])) % 180
+
+
+def canonical(n) -> tuple[float, float]:
+    """ n or -n, such that the same orientation always gives the same key """
+    if n[0] < 0 or (n[0] == 0 and n[1] < 0):
+        return -n[0], -n[1]
+    return n[0], n[1]
+
+
+def compactExact(data: list[Data]) -> list[Data]:
+    """ Merge identical normals (up to the sign) of the same type into one
+    Data weighted by the sum of their weights.
+
+    Since the cost of a Data only depends on its type and on |n.S|, the
+    weighted mean cost of the result is exactly the one of the input (up to
+    the floating point summation order).
+    """
+    merged: dict = {}
+    for x in data:
+        key = (classes[x.code], canonical(x.n))
+        merged[key] = merged.get(key, 0) + x.w
+    return [t(list(n), w) for (t, n), w in merged.items()]
+
+
+def mergeCluster(t: type, cluster: list[Data]) -> Data:
+    # Weighted mean of axial data: average the doubled angles
+    c = sum(x.w * math.cos(2 * math.radians(axialAngle(x.n))) for x in cluster)
+    s = sum(x.w * math.sin(2 * math.radians(axialAngle(x.n))) for x in cluster)
+    a = math.atan2(s, c) / 2
+    return t([math.cos(a), math.sin(a)], sum(x.w for x in cluster))
+
+
+def compact(data: list[Data], tolerance: float = 0) -> list[Data]:
+    """ Merge the normals of the same type into weighted representatives
+
+    Args:
+        data (list[Data]): a list of Data
+        tolerance (float, optional): the angular tolerance in degrees. Defaults to 0,
+            i.e., only the exact duplicates are merged (see compactExact).
+
+    Returns:
+        list[Data]: the compacted data. With a tolerance, the orientations of a group
+        span at most `tolerance` degrees, and since the costs are 1-Lipschitz
+        according to the angle, the mean cost changes at most by radians(tolerance).
+    """
+    if tolerance <= 0:
+        return compactExact(data)
+
+    result = []
+    for t in dict.fromkeys(classes[x.code] for x in data):  # keep the order of the types
+        items = sorted((x for x in data if x.code == t.code), key=lambda x: axialAngle(x.n))
+        clusters = []
+        for x in items:
+            if clusters and axialAngle(x.n) - axialAngle(clusters[-1][0].n) <= tolerance:
+                clusters[-1].append(x)
+            else:
+                clusters.append([x])
+        # The orientations are periodic: the last cluster may join the first one
+        if len(clusters) > 1 and axialAngle(clusters[0][-1].n) + 180 - axialAngle(clusters[-1][0].n) <= tolerance:
+            clusters[0] = clusters.pop() + clusters[0]
+        result += [mergeCluster(t, cluster) for cluster in clusters]
+    return result
+
+
+def histogramBound(bins: int) -> float:
+    """ The worst-case error on the mean cost when the normals are binned into
+    `bins` angular bins: each normal moves at most half a bin, i.e., 90/bins
+    degrees, and the costs are 1-Lipschitz according to the angle (in radians).
+    """
+    return math.pi / (2 * bins)
+
+
+def binsForError(error: float) -> int:
+    """ The number of bins needed for a worst-case mean cost error of `error` """
+    return math.ceil(math.pi / (2 * error))
+
+
+def histogram(data: list[Data], bins: int) -> tuple[list[Data], float]:
+    """ Compress the data of each type into (at most) `bins` angular bins over
+    [0, 180[. Each non-empty bin becomes one Data located at the center of
+    the bin and weighted by the sum of the weights of its normals, so that a
+    cost evaluation is O(bins) instead of O(len(data)).
+
+    Returns:
+        tuple[list[Data], float]: the binned data and the worst-case error on
+        the mean cost (see histogramBound)
+    """
+    width = 180 / bins
+    weights: dict = {}
+    for x in data:
+        i = min(int(axialAngle(x.n) / width), bins - 1)
+        key = (classes[x.code], i)
+        weights[key] = weights.get(key, 0) + x.w
+
+    result = []
+    for (t, i), w in weights.items():
+        a = math.radians((i + 0.5) * width)
+        result.append(t([math.cos(a), math.sin(a)], w))
+    return result, histogramBound(bins)
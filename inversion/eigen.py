@@ -0,0 +1,89 @@
+import numpy as np
+
+
+def principalDirections(tensors, check: bool = False, tolerance: float = 1e-8):
+    """ Batched version of compute_principal_directions (others/principal-directions.py) for
+    stacks of symmetric tensors, using closed-form formulas.
+
+    Parameters:
+    -----------
+    tensors : array_like
+        A (n, 2, 2) or (n, 3, 3) stack of symmetric tensors
+    check : bool
+        If True, check that all the tensors are symmetric (in one vectorized pass)
+    tolerance : float
+        Relative tolerance of the symmetry check, and of the separation of the eigenvalues
+        below which the 3D eigenvectors are computed by np.linalg.eigh instead
+
+    Returns:
+    --------
+    eigenvalues : ndarray
+        The (n, d) eigenvalues, in descending order
+    eigenvectors : ndarray
+        The (n, d, d) eigenvectors, eigenvectors[i, :, j] being the one of eigenvalues[i, j]
+    """
+    A = np.asarray(tensors, dtype=float)
+    if check:
+        scale = np.abs(A).max(axis=(-2, -1))
+        asymmetry = np.abs(A - np.swapaxes(A, -2, -1)).max(axis=(-2, -1))
+        if np.any(asymmetry > tolerance * np.maximum(scale, 1)):
+            raise ValueError(f"{np.count_nonzero(asymmetry > tolerance * np.maximum(scale, 1))} tensors are not symmetric")
+    if A.shape[-1] == 2:
+        return eigen2(A)
+    return eigen3(A, tolerance)
+
+
+def eigen2(A: np.ndarray):
+    xx, xy, yy = A[:, 0, 0], A[:, 0, 1], A[:, 1, 1]
+    mean, radius = (xx + yy) / 2, np.hypot((xx - yy) / 2, xy)
+    values = np.column_stack((mean + radius, mean - radius))
+    # The first direction is at the angle phi = atan2(2 xy, xx - yy) / 2
+    phi = np.arctan2(2 * xy, xx - yy) / 2
+    c, s = np.cos(phi), np.sin(phi)
+    vectors = np.stack((np.column_stack((c, s)), np.column_stack((-s, c))), axis=-1)
+    return values, vectors
+
+
+def eigen3(A: np.ndarray, tolerance: float):
+    n = len(A)
+    xx, yy, zz = A[:, 0, 0], A[:, 1, 1], A[:, 2, 2]
+    xy, xz, yz = A[:, 0, 1], A[:, 0, 2], A[:, 1, 2]
+
+    # Eigenvalues: trigonometric solution of the characteristic polynomial
+    q = (xx + yy + zz) / 3
+    p1 = xy * xy + xz * xz + yz * yz
+    p2 = (xx - q) ** 2 + (yy - q) ** 2 + (zz - q) ** 2 + 2 * p1
+    p = np.sqrt(p2 / 6)
+    safe = np.where(p > 0, p, 1)
+    bxx, byy, bzz = (xx - q) / safe, (yy - q) / safe, (zz - q) / safe
+    bxy, bxz, byz = xy / safe, xz / safe, yz / safe
+    det = bxx * (byy * bzz - byz * byz) - bxy * (bxy * bzz - byz * bxz) + bxz * (bxy * byz - byy * bxz)
+    phi = np.arccos(np.clip(det / 2, -1, 1)) / 3
+    l1 = q + 2 * p * np.cos(phi)
+    l3 = q + 2 * p * np.cos(phi + 2 * np.pi / 3)
+    l2 = 3 * q - l1 - l3
+    values = np.column_stack((l1, l2, l3))
+
+    # Eigenvectors of l1 and l3: the largest cross product of two rows of A - l I
+    def vector(l):
+        rows = A - l[:, None, None] * np.eye(3)
+        crosses = np.stack((np.cross(rows[:, 0], rows[:, 1]),
+                            np.cross(rows[:, 0], rows[:, 2]),
+                            np.cross(rows[:, 1], rows[:, 2])), axis=1)
+        norms = np.linalg.norm(crosses, axis=-1)
+        best = np.argmax(norms, axis=1)
+        v = crosses[np.arange(n), best]
+        return v / np.where(norms[np.arange(n), best] > 0, norms[np.arange(n), best], 1)[:, None]
+
+    v1, v3 = vector(l1), vector(l3)
+    v2 = np.cross(v3, v1)
+    vectors = np.stack((v1, v2, v3), axis=-1)
+
+    # Close eigenvalues: the cross products are not stable, use eigh for these tensors
+    scale = np.maximum(np.abs(values).max(axis=1), 1e-300)
+    unstable = (l1 - l2 < tolerance * scale) | (l2 - l3 < tolerance * scale) | (p == 0)
+    if np.any(unstable):
+        w, v = np.linalg.eigh(A[unstable])
+        values[unstable] = w[:, ::-1]
+        vectors[unstable] = v[:, :, ::-1]
+    return values, vectors
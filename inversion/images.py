@@ -0,0 +1,88 @@
+import os
+import sys
+import cv2
+import numpy as np
+from multiprocessing import Pool
+
+EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+
+def detectSegments(filename: str, threshold: int = 80, minLineLength: int = 50, maxLineGap: int = 10) -> np.ndarray:
+    """ Detect the linear features of an image (same steps as detectContours.py)
+
+    Args:
+        filename (str): the image file
+        threshold, minLineLength, maxLineGap: parameters of the Hough transform
+
+    Returns:
+        np.ndarray: a (n, 4) array of segments (x1, y1, x2, y2) in pixels
+    """
+    image = cv2.imread(filename)
+    if image is None:
+        raise Exception(f'cannot read image {filename}')
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=threshold,
+                            minLineLength=minLineLength, maxLineGap=maxLineGap)
+    if lines is None:
+        return np.zeros(shape=(0, 4))
+    return lines.reshape(-1, 4).astype(float)
+
+
+def segmentsToNormals(segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ Transform segments into 2D fracture normals weighted by their length
+
+    The y axis of an image points downward, so it is flipped to get the
+    same frame as the data files (y pointing upward).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the (n, 2) unit normals and the (n,) lengths
+    """
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 1] - segments[:, 3]  # flipped y axis
+    lengths = np.hypot(dx, dy)
+    keep = lengths > 0
+    dx, dy, lengths = dx[keep], dy[keep], lengths[keep]
+    # The normal of the direction (dx, dy) is (-dy, dx)
+    normals = np.column_stack((-dy / lengths, dx / lengths))
+    return normals, lengths
+
+
+def imageToNormals(filename: str) -> tuple[np.ndarray, np.ndarray]:
+    return segmentsToNormals(detectSegments(filename))
+
+
+def listImages(directory: str) -> list[str]:
+    names = sorted(os.listdir(directory))
+    return [os.path.join(directory, name) for name in names if name.lower().endswith(EXTENSIONS)]
+
+
+def imagesToFile(directory: str, filename: str, processes: int = None) -> int:
+    """ Detect the fractures of all the images of a directory using a pool of
+    workers, and write the weighted normals in a file that can be loaded using
+    Model.addFromFile. Each line is 'nx ny length'.
+
+    Args:
+        directory (str): the directory containing the images
+        filename (str): the output file
+        processes (int, optional): the number of workers. Defaults to the number of CPUs.
+
+    Returns:
+        int: the number of normals written
+    """
+    images = listImages(directory)
+    count = 0
+    with Pool(processes) as pool, open(filename, 'w') as f:
+        # imap keeps the order of the images, so the output is reproducible
+        for normals, lengths in pool.imap(imageToNormals, images):
+            for n, l in zip(normals, lengths):
+                f.write(f'{n[0]} {n[1]} {l}\n')
+            count += len(lengths)
+    return count
+
+
+if __name__ == '__main__':
+    # python images.py <images-directory> <output-file>
+    n = imagesToFile(sys.argv[1], sys.argv[2])
+    print(n, 'normals written to', sys.argv[2])
@@ -6,7 +6,8 @@ if __name__ == '__main__':
     model = Model()
     model.addFromFile("../data/matelles-joints.txt", 'joint')
     model.addFromFile("../data/matelles-stylolites.txt", 'stylolite')
-    model.run(10000)
+    model.useCache()
+    model.run(10000, seed=1)
     model.plotDomain(50)
 
     plotCostFunctions()
@@ -0,0 +1,82 @@
+import tracemalloc
+import random as rnd
+import math
+from DataFactory import create, names
+from ArrayData import ArrayData
+from store import MeasurementStore
+
+
+class DictData:
+    """ The former layout of the measurements (an instance __dict__ and a list normal),
+    for comparison only
+    """
+
+    def __init__(self, n, w: float = 1.0) -> None:
+        self.n_ = n
+        self.w_ = w
+
+
+def measure(make, n: int, weighted: bool) -> float:
+    """ The memory (in bytes) allocated per object by `make(normal, weight)`, the
+    list holding the objects included
+    """
+    angles = [rnd.uniform(0, math.pi) for _ in range(n)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make([math.cos(a), math.sin(a)], rnd.uniform(0.5, 2) if weighted else 1.0) for a in angles]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / n
+
+
+def measureStore(n: int, weighted: bool) -> tuple[float, float]:
+    """ The memory (in bytes) per measurement of a MeasurementStore, with a list of the
+    views of all the measurements, and alone (the views being created on demand, as in
+    Model)
+    """
+    angles = [rnd.uniform(0, math.pi) for _ in range(n)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = MeasurementStore()
+    for a in angles:
+        store.add(names['joint'], (math.cos(a), math.sin(a)), rnd.uniform(0.5, 2) if weighted else 1.0)
+    arrays = tracemalloc.get_traced_memory()[0]
+    views = list(store)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del views, store
+    return (after - before) / n, (arrays - before) / n
+
+
+def memoryBenchmark(n: int = 100000, weighted: bool = False) -> dict:
+    """ The memory per measurement of the Data objects, of the former layout, of the
+    views of a MeasurementStore (kept in a list, or created on demand as in Model) and
+    of the same measurements stored in an ArrayData
+
+    Args:
+        n (int, optional): the number of measurements. Defaults to 100000.
+        weighted (bool, optional): if True, each measurement has its own weight (otherwise
+            they all share the default weight 1.0). Defaults to False.
+    """
+    result = {
+        'dict': measure(DictData, n, weighted),
+        'slots': measure(lambda normal, w: create('joint', normal, w), n, weighted)
+    }
+    result['views'], result['store'] = measureStore(n, weighted)
+    data = [create('joint', [1, 0]) for _ in range(n)]
+    tracemalloc.start()
+    arrays = ArrayData(data)
+    result['arrays'] = tracemalloc.get_traced_memory()[0] / n
+    tracemalloc.stop()
+    del arrays
+    print(f"{n} measurements: {result['dict']:.0f} bytes each with a __dict__ and a list, "
+          f"{result['slots']:.0f} bytes each slotted ({result['dict'] / result['slots']:.1f}x less), "
+          f"{result['views']:.0f} bytes each as views of a store ({result['dict'] / result['views']:.1f}x less), "
+          f"{result['store']:.0f} bytes each in a Model (a store whose views are created on demand) "
+          f"({result['dict'] / result['store']:.1f}x less), {result['arrays']:.0f} bytes each in an ArrayData")
+    return result
+
+
+if __name__ == '__main__':
+    memoryBenchmark()
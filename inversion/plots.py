@@ -2,11 +2,10 @@ import Data
 import math
 import numpy as np
 import matplotlib.pyplot as plt
-import functools
+from DataFactory import meanCosts
 from RemoteStress import RemoteStress
 from Joint import Joint
 from Stylolite import Stylolite
-from tools import lerp
 
 
 def plotCostFunctions():
@@ -47,19 +46,24 @@ def plotCostFunctions():
     plt.show()
 
 
-def plotDomain(data: list[Data], n: int):
-    Z = np.zeros(shape=(n, n))
+def computeDomain(data: list[Data], n: int, min_: float = 0.001, max_: float = 0.99) -> np.ndarray:
+    """ The (n, n) grid of the mean costs, Z[j][i] for theta_j in [0, 180] and k_i in [min_, max_] """
+    # All the (theta, k) of the grid are evaluated at once
+    thetas, ks = np.meshgrid(np.linspace(0, 180, n), np.linspace(min_, max_, n), indexing='ij')
+    return np.asarray(meanCosts(data, thetas.ravel(), ks.ravel())).reshape(n, n)
+
+
+def plotDomain(data: list[Data], n: int, Z: np.ndarray = None, filename: str = None, raster: bool = False):
+    """ Plot the cost domain. With raster=True, the domain is drawn as an image (see renderDomain).
+    If a filename is given, the figure is saved instead of shown.
+    """
     min_ = 0.001
     max_ = 0.99
-    remote = RemoteStress()
-    for i in range(0, n):
-        k = lerp(min_, max_, i / (n - 1))
-        for j in range(0, n):
-            theta = lerp(0, 180, j / (n - 1))
-            remote.set(theta, k)
-            Z[j][i] = functools.reduce(lambda a, b: a + b, [x.cost(remote) for x in data]) / len(data)
-
-    X, Y = np.meshgrid(np.linspace(min_, max_, n), np.linspace(0, 180, n))
+    if Z is None:
+        Z = computeDomain(data, n, min_, max_)
+    if raster:
+        return renderDomain(Z, filename, min_=min_, max_=max_)
+
     levels = np.linspace(Z.min(), Z.max(), 50)
     cmap = 'jet'
     fig, ax = plt.subplots(figsize=(6, 6))
@@ -69,4 +73,68 @@ def plotDomain(data: list[Data], n: int):
     ax.margins(0.2)
     ax.set_title("Domain")
     fig.colorbar(plt.cm.ScalarMappable(cmap=cmap), ax=ax, orientation='vertical', label='Cost')
-    plt.show()
+    show(fig, filename)
+
+
+def renderDomain(Z: np.ndarray, filename: str = None, pixels: int = 1024, levels: int = 5,
+                 min_: float = 0.001, max_: float = 0.99, cmap: str = 'jet'):
+    """ Fast rendering of a large cost domain Z[j][i] (theta_j, k_i), e.g. a memory-mapped one
+    (see tiles.py): the grid is reduced to at most `pixels` x `pixels` values, each one the
+    min of its block of the grid (so that the minimum stays visible, the rows being read
+    block by block), drawn with a few level lines.
+
+    Args:
+        Z (np.ndarray): the domain
+        filename (str, optional): the PNG file. Defaults to None, i.e., the figure is shown.
+        pixels (int, optional): the max resolution of the image. Defaults to 1024.
+        levels (int, optional): the number of level lines. Defaults to 5.
+    """
+    steps = [max(1, math.ceil(size / pixels)) for size in Z.shape]
+    starts = [np.arange(0, size, step) for size, step in zip(Z.shape, steps)]
+    image = np.array([np.minimum.reduceat(np.asarray(Z[j:j + steps[0]]).min(axis=0), starts[1]) for j in starts[0]])
+
+    def coordinates(starts: np.ndarray, size: int, lo: float, hi: float):
+        # The edges and the centers of the blocks (the last one may be smaller), the
+        # sample i being at lo + (hi - lo) i / (size - 1)
+        scale = (hi - lo) / max(size - 1, 1)
+        ends = np.append(starts[1:], size)
+        return lo + scale * (np.append(starts, size) - 0.5), lo + scale * (starts + ends - 1) / 2
+
+    thetaEdges, thetas = coordinates(starts[0], Z.shape[0], 0, 180)
+    kEdges, ks = coordinates(starts[1], Z.shape[1], min_, max_)
+    fig, ax = plt.subplots(figsize=(6, 6))
+    im = ax.pcolormesh(kEdges, thetaEdges, image, cmap=cmap)
+    if levels > 0:
+        ax.contour(ks, thetas, image, levels=levels, colors='black', linewidths=0.5)
+    ax.set_xlabel('R')
+    ax.set_ylabel('Theta')
+    ax.set_title("Domain")
+    fig.colorbar(im, ax=ax, orientation='vertical', label='Cost')
+    show(fig, filename)
+
+
+def plotStressMap(result: dict, filename: str = None, cmap: str = 'jet'):
+    """ Plot the result of spatial.localInversion: the direction of S1 at each node,
+    colored by the cost of the node
+    """
+    X, Y = np.meshgrid(result['x'], result['y'])
+    a = np.radians(result['theta'])
+    # S1 is (sin(theta), cos(theta)) (see RemoteStress.set), drawn as a segment
+    fig, ax = plt.subplots(figsize=(7, 6))
+    q = ax.quiver(X, Y, np.sin(a), np.cos(a), result['cost'], cmap=cmap, pivot='middle',
+                  headwidth=0, headlength=0, headaxislength=0)
+    ax.set_aspect('equal')
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.set_title("S1 directions")
+    fig.colorbar(q, ax=ax, orientation='vertical', label='Cost')
+    show(fig, filename)
+
+
+def show(fig, filename: str = None):
+    """ Save the figure in a file (without blocking), or show it """
+    if filename is None:
+        plt.show()
+    else:
+        fig.savefig(filename, dpi=150)
+        plt.close(fig)
@@ -0,0 +1,58 @@
+import math
+import numpy as np
+from DataFactory import classes, groups
+
+
+def derivatives(data, theta: float, k: float):
+    """ The weighted mean cost of the data (a list of Data or an ArrayData) for one remote
+    stress, with its gradient and its hessian with respect to (theta in radians, k)
+    """
+    cost, gradient, hessian, W = 0.0, np.zeros(2), np.zeros((2, 2)), 0.0
+    for code, normals, weights in groups(data):
+        c, g, h = classes[code].batchDerivatives(normals, weights, theta, k)
+        cost, gradient, hessian = cost + c, gradient + g, hessian + h
+        W += float(np.sum(weights))
+    return cost / W, gradient / W, hessian / W
+
+
+def polish(data, theta: float, k: float, min_: float = 0.001, max_: float = 0.99,
+           tolerance: float = 1e-10, maxIterations: int = 50):
+    """ Refine a solution (e.g., the best simulation of MonteCarlo.monteCarlo) by Newton
+    steps using the analytic derivatives of the costs (see Data.batchDerivatives)
+
+    The hessian is shifted when it is not positive definite, so that each step is a
+    descent direction, and the step is halved until the cost decreases (the costs
+    1 - |n.S| have kinks, where the subgradient of minimal norm is used). The directions
+    where the cost is flat (e.g., k for joints and stylolites) are left unchanged.
+
+    Args:
+        data: a list of Data or an ArrayData
+        theta (float): the initial theta, in degrees
+        k (float): the initial k
+        tolerance (float, optional): the size of the last step, in radians. Defaults to 1e-10.
+        maxIterations (int, optional): Defaults to 50.
+
+    Returns:
+        tuple[float, float, float, int]: the refined theta, k and cost, and the number of
+        iterations
+    """
+    x = np.array([math.radians(theta), k])
+    cost, gradient, hessian = derivatives(data, theta, k)
+    for iteration in range(1, maxIterations + 1):
+        shift = max(0.0, -np.linalg.eigvalsh(hessian)[0]) + 1e-12
+        step = np.linalg.lstsq(hessian + shift * np.eye(2), -gradient, rcond=None)[0]
+        t = 1.0
+        while t > 1e-12:
+            y = x + t * step
+            y[1] = min(max(y[1], min_), max_)
+            c, g, h = derivatives(data, math.degrees(y[0]), y[1])
+            if c <= cost:
+                break
+            t /= 2
+        else:
+            break  # no descent: x is a minimum up to the rounding errors
+        moved = np.abs(y - x).max()
+        x, cost, gradient, hessian = y, c, g, h
+        if moved < tolerance:
+            break
+    return math.degrees(x[0]) % 180, float(x[1]), float(cost), iteration
@@ -0,0 +1,109 @@
+import numpy as np
+
+# Samplers of the unit square [0, 1[ x [0, 1[, mapped to (theta, k) by the Monte Carlo
+# simulations. The points are generated by blocks, and a sampler continues its sequence
+# from one block to the next (its state can be pickled in a checkpoint).
+
+
+class Sampler:
+    def sample(self, m: int) -> np.ndarray:
+        """ The next m points, as a (m, 2) array """
+        pass
+
+
+class RandomSampler(Sampler):
+    """ Uniform pseudo-random points """
+
+    def __init__(self, seed: int = None) -> None:
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, m: int) -> np.ndarray:
+        return self.rng.random((m, 2))
+
+
+class StratifiedSampler(Sampler):
+    """ Each block of m points is jittered on a g x g grid (g = floor(sqrt(m))): one
+    random point per cell, the remaining m - g^2 points being uniform
+    """
+
+    def __init__(self, seed: int = None) -> None:
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, m: int) -> np.ndarray:
+        g = int(np.sqrt(m))
+        i, j = np.meshgrid(np.arange(g), np.arange(g), indexing='ij')
+        cells = np.column_stack((i.ravel(), j.ravel()))
+        points = (cells + self.rng.random((g * g, 2))) / g
+        return np.concatenate((points, self.rng.random((m - g * g, 2))))
+
+
+class HaltonSampler(Sampler):
+    """ Halton sequence (bases 2 and 3). If scrambled, the sequence is randomly shifted
+    modulo 1 (Cranley-Patterson rotation).
+    """
+    bases = (2, 3)
+
+    def __init__(self, scramble: bool = False, seed: int = None) -> None:
+        self.index = 1  # the point 0 is (0, 0)
+        self.shift = np.random.default_rng(seed).random(2) if scramble else np.zeros(2)
+
+    def sample(self, m: int) -> np.ndarray:
+        i = np.arange(self.index, self.index + m)
+        self.index += m
+        points = np.column_stack([radicalInverse(i, base) for base in self.bases])
+        return (points + self.shift) % 1
+
+
+def radicalInverse(i: np.ndarray, base: int) -> np.ndarray:
+    """ The digits of i in the base, mirrored around the decimal point """
+    result = np.zeros(len(i))
+    f = 1 / base
+    i = i.copy()
+    while np.any(i > 0):
+        result += f * (i % base)
+        i //= base
+        f /= base
+    return result
+
+
+class SobolSampler(Sampler):
+    """ Sobol sequence in 2D (the first dimension is the van der Corput sequence, the
+    second one uses the primitive polynomial x + 1). If scrambled, a random digital
+    shift is applied, which keeps the low-discrepancy of the sequence.
+    """
+    bits = 32
+
+    def __init__(self, scramble: bool = False, seed: int = None) -> None:
+        self.index = 0
+        # Direction numbers: m_k = 1 for the first dimension, m_k = 2 m_(k-1) xor m_(k-1) for the second one
+        m1, m2 = [1] * self.bits, [1]
+        for _ in range(1, self.bits):
+            m2.append((2 * m2[-1]) ^ m2[-1])
+        self.directions = np.array([[m << (self.bits - 1 - k) for k, m in enumerate(ms)] for ms in (m1, m2)],
+                                   dtype=np.uint64).T
+        rng = np.random.default_rng(seed)
+        self.shift = rng.integers(0, 1 << self.bits, size=2, dtype=np.uint64) if scramble else np.zeros(2, dtype=np.uint64)
+
+    def sample(self, m: int) -> np.ndarray:
+        i = np.arange(self.index, self.index + m, dtype=np.uint64)
+        self.index += m
+        x = np.zeros((m, 2), dtype=np.uint64)
+        for k in range(self.bits):
+            bit = ((i >> np.uint64(k)) & np.uint64(1)).astype(bool)
+            x[bit] ^= self.directions[k]
+        return (x ^ self.shift) / float(1 << self.bits)
+
+
+samplers: dict[str, type] = {
+    'random': RandomSampler,
+    'stratified': StratifiedSampler,
+    'halton': HaltonSampler,
+    'sobol': SobolSampler
+}
+
+
+def create(name: str, **params) -> Sampler:
+    """ e.g. create('sobol', scramble=True, seed=1) """
+    if name not in samplers:
+        raise Exception(f'sampler {name} is unknown!')
+    return samplers[name](**params)
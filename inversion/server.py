@@ -0,0 +1,225 @@
+import sys
+import json
+import asyncio
+import argparse
+import http.client
+import random as rnd
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from Model import Model
+from ArrayData import ArrayData
+from MonteCarlo import monteCarloArrays
+from plots import computeDomain
+from sharding import share, attach
+
+# A long-lived local inversion service: the datasets stay in memory, the CPU work
+# runs in a pool of processes, and the results are cached (the maxResults most recently
+# used). Each version of a dataset is copied once into shared memory: the tasks only
+# carry its descriptor, and each worker maps it on its first task and keeps it until a
+# newer version arrives.
+#
+# Requests are JSON over HTTP (POST):
+#   /load     {"dataset": "matelles", "files": [["../data/matelles-joints.txt", "joint"], ...], "precision": "float64"}
+#   /invert   {"dataset": "matelles", "n": 10000, "seed": 0}
+#   /domain   {"dataset": "matelles", "n": 50}
+#   /datasets {}
+#
+# Run it with: python server.py --port 8765 (or --unix /tmp/inversion.sock)
+
+
+# ------------------------------------------------------------------
+#  Tasks run in the pool of processes
+# ------------------------------------------------------------------
+
+# In each worker, for each dataset: its version, its blocks of shared memory and its ArrayData
+workerDatasets: dict[str, tuple[int, list[SharedMemory], ArrayData]] = {}
+
+
+def workerData(descriptor: tuple) -> ArrayData:
+    """ The ArrayData of a (dataset, version, specs) descriptor, mapped once per version """
+    name, version, specs = descriptor
+    if name in workerDatasets and workerDatasets[name][0] == version:
+        return workerDatasets[name][2]
+    if name in workerDatasets:
+        # An older version: unmapped (the parent frees it)
+        _, blocks, _ = workerDatasets.pop(name)
+        for block in blocks:
+            block.close()
+    blocks, (normals, weights, types) = attach(specs)
+    workerDatasets[name] = (version, blocks, ArrayData.fromArrays(normals, weights, types))
+    return workerDatasets[name][2]
+
+
+def invertTask(descriptor: tuple, n: int, seed: int):
+    rnd.seed(seed)
+    theta, k, cost = monteCarloArrays(workerData(descriptor), n)
+    return {'theta': theta, 'k': k, 'cost': cost}
+
+
+def domainTask(descriptor: tuple, n: int):
+    return {'n': n, 'Z': computeDomain(workerData(descriptor), n).tolist()}
+
+
+# ------------------------------------------------------------------
+#  Service
+# ------------------------------------------------------------------
+
+class Service:
+    datasets: dict[str, ArrayData]
+    versions: dict[str, int]
+    shared: dict[str, tuple[tuple, list[SharedMemory]]]
+    cache: OrderedDict[tuple, asyncio.Future]
+
+    def __init__(self, processes: int = None, maxResults: int = 256) -> None:
+        self.datasets = {}
+        self.versions = {}
+        self.shared = {}
+        self.cache = OrderedDict()
+        self.maxResults = maxResults
+        self.pool = ProcessPoolExecutor(processes)
+
+    @staticmethod
+    def read(params: dict) -> tuple[ArrayData, list[SharedMemory], list[tuple]]:
+        """ Read the files of a dataset and copy its arrays into shared memory (run in a
+        thread, so that the event loop keeps serving the other requests)
+        """
+        model = Model()
+        for filename, dataType in params['files']:
+            model.addFromFile(filename, dataType)
+        data = ArrayData(model.data, params.get('precision', 'float64'))
+        blocks, specs = [], []
+        for array in (data.normals, data.weights, data.types):
+            block, shared = share(array)
+            blocks.append(block)
+            specs.append((block.name, shared.shape, shared.dtype.str))
+        return data, blocks, specs
+
+    async def load(self, params: dict):
+        name = params['dataset']
+        data, blocks, specs = await asyncio.get_running_loop().run_in_executor(None, self.read, params)
+        self.datasets[name] = data
+        # A new version of the dataset: its cached results are no longer used
+        version = self.versions[name] = self.versions.get(name, 0) + 1
+        pending = [f for key, f in self.cache.items() if key[0] == name and not f.done()]
+        self.cache = OrderedDict((key, f) for key, f in self.cache.items() if key[0] != name)
+
+        old = self.shared.get(name)
+        self.shared[name] = ((name, version, specs), blocks)
+        if old is not None:
+            # The previous version is freed when the tasks still using it are done
+            if pending:
+                asyncio.gather(*pending, return_exceptions=True).add_done_callback(lambda _: self.release(old[1]))
+            else:
+                self.release(old[1])
+        return {'dataset': name, 'size': len(data)}
+
+    @staticmethod
+    def release(blocks: list[SharedMemory]) -> None:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    def close(self) -> None:
+        """ Stop the workers and free the shared memory """
+        self.pool.shutdown()
+        for _, blocks in self.shared.values():
+            self.release(blocks)
+        self.shared = {}
+
+    def dataset(self, params: dict) -> ArrayData:
+        name = params.get('dataset')
+        if name not in self.datasets:
+            raise Exception(f'dataset {name} is not loaded!')
+        return self.datasets[name]
+
+    async def compute(self, key: tuple, task, *args):
+        """ Run a task in the pool, once for a given key. Concurrent requests with
+        the same key wait for the same result. Only the maxResults most recently used
+        results are kept.
+        """
+        if key in self.cache:
+            self.cache.move_to_end(key)
+        else:
+            loop = asyncio.get_running_loop()
+            self.cache[key] = asyncio.ensure_future(loop.run_in_executor(self.pool, task, *args))
+            while len(self.cache) > self.maxResults:
+                self.cache.popitem(last=False)
+        future = self.cache[key]
+        try:
+            return await future
+        except Exception:
+            if self.cache.get(key) is future:
+                self.cache.pop(key)  # do not cache the failures
+            raise
+
+    async def handle(self, path: str, params: dict):
+        if path == '/load':
+            return await self.load(params)
+        if path == '/datasets':
+            return {name: len(data) for name, data in self.datasets.items()}
+
+        self.dataset(params)
+        descriptor = self.shared[params['dataset']][0]
+        version = descriptor[1]
+        if path == '/invert':
+            n, seed = int(params.get('n', 10000)), int(params.get('seed', 0))
+            key = (params['dataset'], version, path, n, seed)
+            return await self.compute(key, invertTask, descriptor, n, seed)
+        if path == '/domain':
+            n = int(params.get('n', 50))
+            key = (params['dataset'], version, path, n)
+            return await self.compute(key, domainTask, descriptor, n)
+        raise Exception(f'unknown request {path}')
+
+    async def connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """ A minimal HTTP/1.1 handler: one JSON request per connection """
+        try:
+            method, path, _ = (await reader.readline()).decode().split(' ', 2)
+            length = 0
+            while (line := (await reader.readline()).decode().strip()) != '':
+                name, value = line.split(':', 1)
+                if name.lower() == 'content-length':
+                    length = int(value)
+            body = await reader.readexactly(length) if length > 0 else b''
+            params = json.loads(body) if body else {}
+            status, result = '200 OK', await self.handle(path, params)
+        except Exception as e:
+            status, result = '400 Bad Request', {'error': str(e)}
+        payload = json.dumps(result).encode()
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode() + payload)
+        await writer.drain()
+        writer.close()
+
+    async def serve(self, port: int = 8765, unix: str = None):
+        if unix:
+            server = await asyncio.start_unix_server(self.connection, path=unix)
+        else:
+            server = await asyncio.start_server(self.connection, host='127.0.0.1', port=port)
+        print('inversion service listening on', unix or f'http://127.0.0.1:{port}')
+        async with server:
+            await server.serve_forever()
+
+
+def request(path: str, params: dict = None, port: int = 8765) -> dict:
+    """ Send a request to the service (on localhost), e.g. request('/invert', {'dataset': 'matelles'}) """
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', path, json.dumps(params or {}), {'Content-Type': 'application/json'})
+    response = json.loads(connection.getresponse().read())
+    connection.close()
+    return response
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local inversion service')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', type=str, default=None, help='Unix socket path (instead of the port)')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--max-results', type=int, default=256, help='Number of cached results')
+    args = parser.parse_args(sys.argv[1:])
+    service = Service(args.processes, args.max_results)
+    try:
+        asyncio.run(service.serve(args.port, args.unix))
+    finally:
+        service.close()
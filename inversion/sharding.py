@@ -0,0 +1,123 @@
+import os
+import numpy as np
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from ArrayData import ArrayData
+from DataFactory import kernels
+from backends import getBackend
+
+# Data-parallel evaluation of the costs for huge sets of measurements: the arrays of the
+# measurements are copied once into shared memory, sorted by type code, and each worker
+# of the pool maps them without copying. For a batch of candidate stresses, each worker
+# sums the weighted costs of its shard of measurements, and the partial sums are added.
+
+workerArrays = None
+
+
+def share(array: np.ndarray) -> tuple[SharedMemory, np.ndarray]:
+    """ A copy of the array in a new block of shared memory """
+    block = SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    return block, shared
+
+
+def attach(specs: list[tuple]) -> tuple[list[SharedMemory], list[np.ndarray]]:
+    """ Map the blocks of shared memory given by their (name, shape, dtype) """
+    blocks = [SharedMemory(name=name) for name, _, _ in specs]
+    arrays = [np.ndarray(shape, dtype=dtype, buffer=block.buf) for block, (_, shape, dtype) in zip(blocks, specs)]
+    return blocks, arrays
+
+
+def initWorker(specs: list[tuple]) -> None:
+    global workerArrays
+    workerArrays = attach(specs)
+
+
+def partialCosts(args: tuple) -> tuple[np.ndarray, float]:
+    """ The weighted sums of the costs of a shard for the candidates (in a worker)
+
+    Args:
+        args (tuple): the (code, start, end) slices of the shard, the thetas and the ks
+
+    Returns:
+        tuple[np.ndarray, float]: the (m,) sums of the costs and the sum of the weights
+    """
+    slices, thetas, ks = args
+    _, (normals, weights) = workerArrays
+    backend = getBackend()
+    S1, S3 = backend.principalDirections(thetas, ks)
+    total, W = np.zeros(len(thetas)), 0.0
+    for code, start, end in slices:
+        # Basic slices: views of the shared memory, no copy
+        total += np.asarray(kernels[code](normals[start:end], weights[start:end], S1, S3, backend), dtype=float)
+        W += float(weights[start:end].sum())
+    return total, W
+
+
+class ShardedData:
+    """ The measurements in shared memory, and the pool of processes evaluating them.
+    DataFactory.meanCosts delegates to `meanCosts` (and DataFactory.groups to `groups`),
+    so it can be used instead of an ArrayData, e.g. in MonteCarlo.monteCarloArrays:
+
+        with ShardedData(data, processes=8) as sharded:
+            theta, k, cost = monteCarloArrays(sharded, 10**6)
+    """
+
+    def __init__(self, data: ArrayData, processes: int = None, shards: int = None) -> None:
+        order = np.argsort(data.types, kind='stable')
+        types = data.types[order]
+        self.blocks, arrays = [], []
+        for array in (data.normals, data.weights):
+            block, shared = share(array[order])
+            self.blocks.append(block)
+            arrays.append(shared)
+        self.normals, self.weights = arrays
+        self.pool = Pool(processes, initializer=initWorker,
+                         initargs=([(b.name, a.shape, a.dtype.str) for b, a in zip(self.blocks, arrays)],))
+
+        # The shards: equal ranges of measurements, cut where the type changes
+        shards = shards or processes or os.cpu_count()
+        codes, starts = np.unique(types, return_index=True)
+        self.runs = list(zip(codes.tolist(), starts.tolist(), starts[1:].tolist() + [len(types)]))
+        bounds = np.linspace(0, len(types), shards + 1).astype(int).tolist()
+        self.shards = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            slices = [(code, max(lo, start), min(hi, end)) for code, start, end in self.runs if start < hi and end > lo]
+            if slices:
+                self.shards.append(slices)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def groups(self):
+        """ For each type code, the code, its normals and its weights (views of the shared
+        memory, see DataFactory.groups)
+        """
+        for code, start, end in self.runs:
+            yield code, self.normals[start:end], self.weights[start:end]
+
+    def meanCosts(self, thetas, ks) -> np.ndarray:
+        """ The weighted mean costs of all the measurements for the candidates """
+        thetas, ks = np.asarray(thetas, dtype=float), np.asarray(ks, dtype=float)
+        total, W = np.zeros(len(thetas)), 0.0
+        for partial, w in self.pool.map(partialCosts, [(slices, thetas, ks) for slices in self.shards]):
+            total += partial
+            W += w
+        return total / W
+
+    def close(self) -> None:
+        """ Stop the workers and free the shared memory """
+        self.pool.close()
+        self.pool.join()
+        self.normals = self.weights = None
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self) -> 'ShardedData':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
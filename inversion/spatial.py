@@ -0,0 +1,133 @@
+import numpy as np
+from ArrayData import ArrayData
+from DataFactory import names, kernels
+from backends import Backend, getBackend
+
+# Spatially varying inversion: the measurements have map coordinates (x, y), and one
+# stress orientation is inverted per node of a regular grid, using the measurements
+# within a radius of the node. The data files have the columns 'nx ny w x y' (see
+# Model.addFromFile, which ignores the coordinates).
+
+
+def loadFiles(files: list[tuple[str, str]]) -> tuple[ArrayData, np.ndarray]:
+    """ Load files of located measurements (one call to np.loadtxt per file)
+
+    Args:
+        files (list[tuple[str, str]]): the (filename, dataType) of each file, the lines
+            of the files being 'nx ny w x y'
+
+    Returns:
+        tuple[ArrayData, np.ndarray]: the measurements and their (n, 2) positions
+    """
+    normals, weights, types, positions = [], [], [], []
+    for filename, dataType in files:
+        if dataType not in names:
+            raise Exception(f'data type {dataType} is unknown!')
+        values = np.loadtxt(filename, ndmin=2)
+        if values.shape[1] < 5:
+            raise Exception(f'{filename}: the lines must be "nx ny w x y"')
+        normals.append(values[:, 0:2])
+        weights.append(values[:, 2])
+        types.append(np.full(len(values), names[dataType], dtype=np.int16))
+        positions.append(values[:, 3:5])
+    data = ArrayData.fromArrays(np.concatenate(normals), np.concatenate(weights), np.concatenate(types))
+    return data, np.concatenate(positions)
+
+
+class GridIndex:
+    """ Spatial index of points: the points are sorted by the square cell containing
+    them, so that the points of a cell are a contiguous slice of `order`. Only the
+    occupied cells are indexed (`keys`, sorted), so the memory does not depend on the
+    extent of the points
+    """
+
+    def __init__(self, points: np.ndarray, cell: float) -> None:
+        self.points = np.asarray(points, dtype=float)
+        self.cell = cell
+        self.origin = self.points.min(axis=0)
+        ij = np.floor((self.points - self.origin) / cell).astype(np.int64)
+        self.shape = ij.max(axis=0) + 1
+        keys = ij[:, 0] * self.shape[1] + ij[:, 1]
+        self.order = np.argsort(keys, kind='stable')
+        # The occupied cells, and the start of their points in `order` (plus the end)
+        self.keys, starts = np.unique(keys[self.order], return_index=True)
+        self.starts = np.append(starts, len(keys))
+
+    def query(self, center, radius: float) -> np.ndarray:
+        """ The indices of the points within `radius` of `center` """
+        lo = np.floor((np.asarray(center) - radius - self.origin) / self.cell).astype(np.int64)
+        hi = np.floor((np.asarray(center) + radius - self.origin) / self.cell).astype(np.int64)
+        lo, hi = np.maximum(lo, 0), np.minimum(hi, self.shape - 1)
+        if np.any(lo > hi):
+            return np.empty(0, dtype=np.int64)
+        # The cells of one column i are contiguous: one slice per column, between the
+        # occupied cells found by binary search
+        columns = np.arange(lo[0], hi[0] + 1) * self.shape[1]
+        first = np.searchsorted(self.keys, columns + lo[1], side='left')
+        last = np.searchsorted(self.keys, columns + hi[1], side='right')
+        slices = [self.order[self.starts[a]:self.starts[b]] for a, b in zip(first, last) if a < b]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate(slices)
+        d = self.points[candidates] - center
+        return candidates[d[:, 0] ** 2 + d[:, 1] ** 2 <= radius * radius]
+
+
+def localInversion(data: ArrayData, positions: np.ndarray, spacing: float, radius: float,
+                   resolution: float = 1.0, minCount: int = 10, backend: Backend = None) -> dict:
+    """ Invert the stress orientation at the nodes of a regular grid over the positions
+
+    The candidate orientations (every `resolution` degrees) and their principal directions
+    are computed once and shared by all the windows: the cost of a window is one kernel
+    call per type for all the candidates, and the best one is refined by a parabola through
+    it and its two neighbors. Since the cost does not depend on k, only theta is inverted.
+
+    Args:
+        data (ArrayData): the measurements
+        positions (np.ndarray): their (n, 2) map coordinates
+        spacing (float): the distance between the nodes of the grid
+        radius (float): the radius of the window of a node
+        resolution (float, optional): the step of the candidate orientations, in degrees
+            (rounded so that 180 is a whole number of steps). Defaults to 1.
+        minCount (int, optional): the min number of measurements in a window (otherwise
+            the node has no result). Defaults to 10.
+
+    Returns:
+        dict: 'x' and 'y': the coordinates of the nodes, and the (len(y), len(x)) arrays
+        'theta' (nan where there are not enough measurements), 'cost' and 'count'
+    """
+    backend = backend or getBackend()
+    positions = np.asarray(positions, dtype=float)
+    index = GridIndex(positions, radius)
+    lo, hi = positions.min(axis=0), positions.max(axis=0)
+    x, y = np.arange(lo[0], hi[0] + spacing / 2, spacing), np.arange(lo[1], hi[1] + spacing / 2, spacing)
+
+    # The shared table of candidates, in [0, 180): a whole number of steps, so that the
+    # last candidate is one step before the first one (180)
+    step = 180 / max(3, round(180 / resolution))
+    thetas = np.arange(0, 180, step)
+    S1, S3 = backend.principalDirections(thetas, np.full(len(thetas), 0.5))
+
+    theta, cost = np.full((len(y), len(x)), np.nan), np.full((len(y), len(x)), np.nan)
+    count = np.zeros((len(y), len(x)), dtype=np.int64)
+    for j in range(len(y)):
+        for i in range(len(x)):
+            selected = index.query((x[i], y[j]), radius)
+            count[j, i] = len(selected)
+            if len(selected) < minCount:
+                continue
+            types, normals, weights = data.types[selected], data.normals[selected], data.weights[selected]
+            costs = np.zeros(len(thetas))
+            for code in np.unique(types):
+                mask = types == code
+                costs += np.asarray(kernels[code](normals[mask], weights[mask], S1, S3, backend))
+            costs /= weights.sum()
+            # Parabolic refinement (the candidates are periodic)
+            b = int(np.argmin(costs))
+            c0, c1, c2 = costs[b - 1], costs[b], costs[(b + 1) % len(costs)]
+            curvature = c0 - 2 * c1 + c2
+            offset = 0.5 * (c0 - c2) / curvature if curvature > 0 else 0
+            theta[j, i] = (thetas[b] + offset * step) % 180
+            # The costs are >= 0: the parabola may go below near a kink
+            cost[j, i] = max(c1 - 0.25 * (c0 - c2) * offset, 0.0)
+    return {'x': x, 'y': y, 'theta': theta, 'cost': cost, 'count': count}
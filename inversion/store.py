@@ -0,0 +1,124 @@
+import numpy as np
+from Data import Data
+from ArrayData import ArrayData
+from DataFactory import classes
+
+# The measurements of a model stored in growable arrays, the objects of the Data API
+# being views (store, index) of one row: a view has no normal nor weight of its own,
+# and the views are created on demand (store[i], iteration) so that only the arrays
+# stay in memory. The views are read-only, as the Data objects.
+
+
+class MeasurementStore:
+    """ Growable arrays of measurements (normals, weights and type codes), whose rows are
+    seen as Data objects (see View)
+    """
+    normals: np.ndarray
+    weights: np.ndarray
+    types: np.ndarray
+    size: int
+
+    def __init__(self, capacity: int = 16) -> None:
+        self.normals = np.empty((capacity, 2))
+        self.weights = np.empty(capacity)
+        self.types = np.empty(capacity, dtype=np.int16)
+        self.size = 0
+
+    @staticmethod
+    def fromData(data: list[Data]) -> 'MeasurementStore':
+        """ A store holding (copies of) the measurements of a list of Data """
+        store = MeasurementStore(max(len(data), 1))
+        for x in data:
+            store.append(x)
+        return store
+
+    def grow(self, capacity: int) -> None:
+        self.normals = np.resize(self.normals, (capacity, 2))
+        self.weights = np.resize(self.weights, capacity)
+        self.types = np.resize(self.types, capacity)
+
+    def add(self, code: int, n, w: float = 1.0) -> None:
+        """ Append a measurement of type `code` """
+        if self.size == len(self.weights):
+            self.grow(2 * max(self.size, 8))
+        self.normals[self.size] = n[0], n[1]
+        self.weights[self.size] = w
+        self.types[self.size] = code
+        self.size += 1
+
+    def append(self, x: Data) -> None:
+        """ Append (a copy of) a Data """
+        self.add(x.code, x.n, x.w)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> Data:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('measurement index out of range')
+        return viewClass(int(self.types[index]))(self, index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self[index]
+
+    def arrays(self, precision: str = 'float64') -> ArrayData:
+        """ The measurements as an ArrayData (copies of the arrays) """
+        return ArrayData.fromArrays(self.normals[:self.size].astype(precision), self.weights[:self.size].copy(),
+                                    self.types[:self.size].copy())
+
+    def groups(self):
+        """ For each type code, the code, its normals and its weights (see DataFactory.groups) """
+        types = self.types[:self.size]
+        for code in np.unique(types):
+            mask = types == code
+            yield int(code), self.normals[:self.size][mask], self.weights[:self.size][mask]
+
+
+class View:
+    """ A measurement of a MeasurementStore: the object holds only the store and the
+    index of its row. Its class (see viewClass) has the code and the cost of the Data
+    class of the measurement.
+    """
+    __slots__ = ('store', 'index')
+    code: int
+    lipschitz: tuple[float, float]
+
+    def __init__(self, store: MeasurementStore, index: int) -> None:
+        object.__setattr__(self, 'store', store)
+        object.__setattr__(self, 'index', index)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        # Pickled as a plain measurement
+        return classes[self.code], (self.n, self.w)
+
+    @property
+    def n(self):
+        return tuple(self.store.normals[self.index].tolist())
+
+    @property
+    def w(self):
+        return float(self.store.weights[self.index])
+
+
+# The view class of each type code
+views: dict[int, type] = {}
+
+
+def viewClass(code: int) -> type:
+    """ The class of the views of the measurements of type `code`: the code, the Lipschitz
+    constants and the cost of its Data class (the cost only reads n)
+    """
+    if code not in views:
+        cls = classes[code]
+        views[code] = type(cls.__name__ + 'View', (View,),
+                           {'__slots__': (), 'code': code, 'lipschitz': cls.lipschitz, 'cost': cls.cost})
+    return views[code]
@@ -0,0 +1,70 @@
+import numpy as np
+
+# Resolution of stresses on planes, for arrays of stresses and arrays of planes (2D or 3D).
+# The stresses are (..., d, d) symmetric tensors and the normals (..., d) unit vectors: their
+# leading dimensions are broadcast, e.g. (m, 1, d, d) stresses and (n, d) normals give (m, n)
+# results. The formulas are written with the tensor components, so that no (..., d, d)
+# temporary is created.
+
+
+def tensors(thetas, ks) -> np.ndarray:
+    """ The (m, 2, 2) remote stresses given by (theta, k), as in RemoteStress.set """
+    a = np.radians(np.asarray(thetas, dtype=float))
+    k = np.asarray(ks, dtype=float)
+    c, s = np.cos(a), np.sin(a)
+    xx, xy, yy = k * s * s, k * c * s, k * c * c
+    return np.stack((np.stack((xx, xy), axis=-1), np.stack((xy, yy), axis=-1)), axis=-2)
+
+
+def planeNormals(angles) -> np.ndarray:
+    """ The (..., 2) normals (cos(theta), sin(theta)) of planes given by their angles in degrees """
+    a = np.radians(np.asarray(angles, dtype=float))
+    return np.stack((np.cos(a), np.sin(a)), axis=-1)
+
+
+def traction(stresses, normals) -> np.ndarray:
+    """ The traction vectors t = S.n """
+    S = np.asarray(stresses)
+    n = np.asarray(normals)
+    if S.shape[-1] == 2:
+        sxx, sxy, syy = S[..., 0, 0], S[..., 0, 1], S[..., 1, 1]
+        nx, ny = n[..., 0], n[..., 1]
+        return np.stack((sxx * nx + sxy * ny, sxy * nx + syy * ny), axis=-1)
+    sxx, sxy, sxz = S[..., 0, 0], S[..., 0, 1], S[..., 0, 2]
+    syy, syz, szz = S[..., 1, 1], S[..., 1, 2], S[..., 2, 2]
+    nx, ny, nz = n[..., 0], n[..., 1], n[..., 2]
+    return np.stack((sxx * nx + sxy * ny + sxz * nz,
+                     sxy * nx + syy * ny + syz * nz,
+                     sxz * nx + syz * ny + szz * nz), axis=-1)
+
+
+def resolve(stresses, normals) -> tuple[np.ndarray, np.ndarray]:
+    """ The normal stress and the shear stress magnitude of stresses on planes (2D or 3D)
+
+    Args:
+        stresses: (..., d, d) symmetric tensors
+        normals: (..., d) unit normals of the planes
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: sigma_n = n.S.n and tau = |S.n - sigma_n n|
+    """
+    n = np.asarray(normals, dtype=float)
+    t = traction(stresses, n)
+    d = n.shape[-1]
+    t2 = sum(t[..., i] * t[..., i] for i in range(d))
+    sigma = sum(t[..., i] * n[..., i] for i in range(d))
+    tau = np.sqrt(np.maximum(t2 - sigma * sigma, 0))
+    return sigma, tau
+
+
+def normalAndShear(stresses, angles) -> tuple[np.ndarray, np.ndarray]:
+    """ Vectorized version of normalAndShear in others/normal-shear-stress.py: the normal
+    and the signed shear stress of 2D stresses on planes whose normal is at `angles` degrees
+    """
+    S = np.asarray(stresses, dtype=float)
+    a = np.radians(np.asarray(angles, dtype=float))
+    sxx, sxy, syy = S[..., 0, 0], S[..., 0, 1], S[..., 1, 1]
+    cos, sin = np.cos(2 * a), np.sin(2 * a)
+    n = 0.5 * (sxx + syy) + 0.5 * (sxx - syy) * cos + sxy * sin
+    s = 0.5 * (syy - sxx) * sin + sxy * cos
+    return n, s
@@ -0,0 +1,84 @@
+import warnings
+import numpy as np
+from RemoteStress import RemoteStress
+from stress import tensors, resolve
+from eigen import principalDirections
+
+
+def remoteTensors(remotes) -> np.ndarray:
+    """ The (m, 2, 2) stresses of one RemoteStress or a list of them (e.g., from a bootstrap) """
+    if isinstance(remotes, RemoteStress):
+        remotes = [remotes]
+    return tensors([r.theta for r in remotes], [r.k for r in remotes])
+
+
+def principalValues(stresses: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ The max and min principal values of (m, 2, 2) stresses """
+    values, _ = principalDirections(stresses)
+    return values[:, 0], values[:, -1]
+
+
+def tendencies(remotes, normals, weights=None, chunk: int = 1 << 20, bins: int = 50, slipMax: float = 2.0) -> dict:
+    """ Slip tendency tau / sigma_n and dilation tendency (sigma_1 - sigma_n) / (sigma_1 - sigma_3)
+    of all the fractures, for one inverted stress or a stack of stresses (compression positive,
+    sigma_1 being the max principal value).
+
+    The fractures are processed by chunks of `chunk` normals, so that only (m, chunk) temporaries
+    are created whatever the size of the network.
+
+    Args:
+        remotes: a RemoteStress or a list of RemoteStress
+        normals: the (n, 2) unit normals of the fractures
+        weights (optional): the (n,) weights of the fractures in the histograms (e.g., their lengths)
+        chunk (int, optional): the number of fractures processed at once. Defaults to 2^20.
+        bins (int, optional): the number of bins of the histograms. Defaults to 50.
+        slipMax (float, optional): the upper bound of the slip tendency histogram (the larger
+            values are counted in the last bin). Defaults to 2.
+
+    Returns:
+        dict: 'slip' and 'dilation': the (n,) tendencies of the fractures (averaged over the
+        stresses), 'slipStd' and 'dilationStd': their standard deviation over the stresses,
+        'slipHistogram' and 'dilationHistogram': the (m, bins) weighted histograms for each
+        stress, with their bin edges 'slipBins' and 'dilationBins'. The tendencies that are
+        not defined (slip if sigma_n <= 0, dilation if sigma_1 = sigma_3, e.g. k = 0) are
+        left out of the means, of the standard deviations (nan if none is defined) and of
+        the histograms: 'slipInvalid' and 'dilationInvalid' are their (m,) weighted counts
+        for each stress.
+    """
+    S = remoteTensors(remotes)
+    s1, s3 = principalValues(S)
+    normals = np.asarray(normals, dtype=float).reshape(-1, 2)
+    n, m = len(normals), len(S)
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+    slipBins, dilationBins = np.linspace(0, slipMax, bins + 1), np.linspace(0, 1, bins + 1)
+
+    result = {
+        'slip': np.empty(n), 'dilation': np.empty(n),
+        'slipStd': np.empty(n), 'dilationStd': np.empty(n),
+        'slipHistogram': np.zeros((m, bins)), 'dilationHistogram': np.zeros((m, bins)),
+        'slipBins': slipBins, 'dilationBins': dilationBins,
+        'slipInvalid': np.zeros(m), 'dilationInvalid': np.zeros(m)
+    }
+    for start in range(0, n, chunk):
+        end = min(start + chunk, n)
+        sigma, tau = resolve(S[:, None], normals[None, start:end])  # (m, chunk)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slip = np.where(sigma > 0, tau / sigma, np.nan)
+            dilation = (s1[:, None] - sigma) / (s1 - s3)[:, None]
+            dilation[~np.isfinite(dilation)] = np.nan
+            with warnings.catch_warnings():
+                # All-nan columns (no stress defines the tendency) give nan
+                warnings.simplefilter('ignore', RuntimeWarning)
+                for name, values in (('slip', slip), ('dilation', dilation)):
+                    result[name][start:end] = np.nanmean(values, axis=0)
+                    result[name + 'Std'][start:end] = np.nanstd(values, axis=0)
+
+        # Histograms: the bin of each defined value, counted for each stress
+        w = weights[start:end]
+        for name, values, edges in (('slip', slip, slipBins), ('dilation', dilation, dilationBins)):
+            valid = ~np.isnan(values)
+            index = np.clip(np.searchsorted(edges, values, 'right') - 1, 0, bins - 1)
+            for j in range(m):
+                result[name + 'Histogram'][j] += np.bincount(index[j][valid[j]], weights=w[valid[j]], minlength=bins)
+            result[name + 'Invalid'] += (~valid) @ w
+    return result
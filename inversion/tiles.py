@@ -0,0 +1,119 @@
+import os
+import json
+import numpy as np
+from multiprocessing import Pool
+from DataFactory import meanCosts
+from MonteCarlo import runKey
+from tools import lerp
+
+# Out-of-core cost domains: the (n, n) grid Z[j][i] (theta_j in [0, 180], k_i in [min_, max_])
+# is computed by square tiles written into a memory-mapped .npy file. The finished tiles
+# and their min/max/argmin are recorded in a '.json' file next to it, so that an interrupted
+# computation resumes with the remaining tiles, and the statistics of the whole grid are
+# known without reading it.
+
+workerData = None
+
+
+def initWorker(data) -> None:
+    global workerData
+    workerData = data
+
+
+def computeTile(args: tuple) -> tuple:
+    """ Compute one tile and write it into the memory-mapped file (in a worker) """
+    filename, n, (j0, j1, i0, i1), min_, max_ = args
+    thetas, ks = np.meshgrid(lerp(0, 180, np.arange(j0, j1) / (n - 1)),
+                             lerp(min_, max_, np.arange(i0, i1) / (n - 1)), indexing='ij')
+    Z = np.asarray(meanCosts(workerData, thetas.ravel(), ks.ravel())).reshape(thetas.shape)
+    out = np.load(filename, mmap_mode='r+')
+    out[j0:j1, i0:i1] = Z
+    out.flush()
+    del out
+    j, i = np.unravel_index(np.argmin(Z), Z.shape)
+    return [j0, j1, i0, i1], float(Z.min()), float(Z.max()), [int(j0 + j), int(i0 + i)]
+
+
+def tiledDomain(data, filename: str, n: int, tile: int = 1024, processes: int = 1,
+                min_: float = 0.001, max_: float = 0.99, dtype: str = 'float32') -> dict:
+    """ Compute the (n, n) cost domain into the .npy file `filename`, tile by tile
+
+    Args:
+        data: a list of Data or an ArrayData
+        filename (str): the output .npy file. If it exists with its '.json' file, written
+            by the same run (same data, n, tile, min_, max_ and dtype, see MonteCarlo.runKey),
+            only the missing tiles are computed. Otherwise the grid is computed again.
+        n (int): the size of the grid
+        tile (int, optional): the size of the tiles. Defaults to 1024.
+        processes (int, optional): the number of processes computing the tiles. Defaults to 1.
+        dtype (str, optional): the type of the values in the file. Defaults to 'float32'.
+
+    Returns:
+        dict: the statistics of the grid (see domainStats)
+    """
+    progress = filename + '.json'
+    run = runKey(data, 'tiledDomain', n, tile=tile, min_=min_, max_=max_, dtype=np.dtype(dtype).str)
+    state = None
+    if os.path.exists(filename) and os.path.exists(progress):
+        with open(progress, 'r') as f:
+            state = json.load(f)
+        if state.get('run') != run:
+            print(f'ignoring {filename}: computed by another run (data, n, tile, min_, max_ or dtype)')
+            state = None
+    if state is None:
+        np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=(n, n)).flush()
+        state = {'n': n, 'min_': min_, 'max_': max_, 'run': run, 'tiles': []}
+        save(progress, state)
+    done = {tuple(t[0]) for t in state['tiles']}
+
+    todo = [(j, min(j + tile, n), i, min(i + tile, n)) for j in range(0, n, tile) for i in range(0, n, tile)]
+    todo = [(filename, n, t, state['min_'], state['max_']) for t in todo if t not in done]
+    if hasattr(data, 'meanCosts'):
+        # Data sharded across processes (see sharding.py): they cannot be sent to another
+        # pool, so the tiles are computed here, each one by the pool of the shards
+        initWorker(data)
+        try:
+            record(progress, state, map(computeTile, todo))
+        finally:
+            initWorker(None)
+    else:
+        with Pool(processes, initializer=initWorker, initargs=(data,)) as pool:
+            record(progress, state, pool.imap_unordered(computeTile, todo))
+    return domainStats(filename)
+
+
+def save(progress: str, state: dict) -> None:
+    """ Write the progress file atomically (temporary file, then renamed) """
+    with open(progress + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(progress + '.tmp', progress)
+
+
+def record(progress: str, state: dict, results) -> None:
+    """ Record the finished tiles in the progress file """
+    for result in results:
+        state['tiles'].append(result)
+        # The tile is written and flushed: record it
+        save(progress, state)
+
+
+def domainStats(filename: str) -> dict:
+    """ The min, max and argmin (theta, k) of a tiled domain, from its finished tiles """
+    with open(filename + '.json', 'r') as f:
+        state = json.load(f)
+    n, tiles = state['n'], state['tiles']
+    best = min(tiles, key=lambda t: t[1])
+    j, i = best[3]
+    return {
+        'n': n,
+        'complete': sum((t[0][1] - t[0][0]) * (t[0][3] - t[0][2]) for t in tiles) == n * n,
+        'min': best[1],
+        'max': max(t[2] for t in tiles),
+        'theta': lerp(0, 180, j / (n - 1)),
+        'k': lerp(state['min_'], state['max_'], i / (n - 1))
+    }
+
+
+def loadDomain(filename: str) -> np.ndarray:
+    """ The grid, memory-mapped (read only): slices are read from the disk when used """
+    return np.load(filename, mmap_mode='r')
@@ -3,39 +3,16 @@ import matplotlib.pyplot as plt
 import mplstereonet
 from mplstereonet import stereonet_math
 import os
+from angelier import loadAngelier
+from density import DensityCache, densityContourf
 
 def load(name):
-    """Read data from a text file on disk."""
+    """Read data from a text file on disk (see angelier.py)."""
     # Get the data file relative to this file's location...
     datadir = os.path.dirname(__file__)
     filename = os.path.join(datadir, name)
-
-    data = []
-    with open(filename, 'r') as infile:
-        for line in infile:
-            # Skip comments
-            if line.startswith('#'):
-                continue
-
-            # First column: strike, second: dip, third: rake.
-            strike, dip, rake = line.strip().split()
-
-            if rake[-1].isalpha():
-                # If there's a directional letter on the rake column, parse it
-                # normally.
-                strike, dip, rake = mplstereonet.parse_rake(strike, dip, rake)
-            else:
-                # Otherwise, it's actually an azimuthal measurement of the
-                # slickenslide directions, so we need to convert it to a rake.
-                strike, dip = mplstereonet.parse_strike_dip(strike, dip)
-                azimuth = float(rake)
-                rake = mplstereonet.azimuth2rake(strike, dip, azimuth)
-
-            data.append([strike, dip, rake])
-
-    # Separate the columns back out
-    strike, dip, rake = zip(*data)
-    return strike, dip, rake
+    data = loadAngelier(filename)
+    return data['strike'], data['dip'], data['rake']
 
 strikes, dips, rakes = load('angelier-data.txt')
 n_data = len(strikes)
@@ -50,8 +27,9 @@ for i in range(n_data):
     ax.pole(strikes[i], dips[i], 'bo', markersize=4, alpha=0.5)
     
 # 4. Calculer la densité des pôles pour identifier les clusters
-cax = ax.density_contourf(strikes, dips, measurement='poles', cmap='Reds', 
-                         method='kamb', sigma=3, alpha=0.8)
+# (the grid is cached, see density.py: only the styling is applied at each redraw)
+grid = DensityCache().grid(strikes, dips, measurement='poles', method='kamb', sigma=3)
+cax = densityContourf(ax, grid, cmap='Reds', alpha=0.8)
 fig.colorbar(cax)
 
 # 5. Identifier les orientations principales (directions préférentielles)